@@ -20,6 +20,16 @@ case $command in
     python /opt/src/predict.py "$@"
     ;;
 
+  # If the command is "quantize", run the quantize.py script with all remaining arguments
+  quantize)
+    python /opt/src/quantize.py "$@"
+    ;;
+
+  # If the command is "serve", run the serve.py script with all remaining arguments
+  serve)
+    python /opt/src/serve.py "$@"
+    ;;
+
   # If the command is "standby", keep the container running without doing anything
   standby)
     tail -f /dev/null
@@ -30,6 +40,8 @@ case $command in
     echo "Invalid or missing command. Please specify one of the following commands:"
     echo "train: Train the model"
     echo "predict: Make batch predictions with the model"
+    echo "quantize: Quantize the trained model for CPU inference"
+    echo "serve: Serve online predictions with the model over HTTP"
     echo "standby: Run the container in standby mode to keep the container running without doing anything"
     exit 1
     ;;
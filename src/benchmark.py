@@ -0,0 +1,147 @@
+import time
+import argparse
+import torch
+from typing import List
+from torch.utils.data import DataLoader, Dataset, Subset
+
+from logger import get_logger
+from prediction.predictor_model import ImageClassifier, get_classifier_class
+
+logger = get_logger(task_name="benchmark")
+
+
+class SyntheticImageDataset(Dataset):
+    """Dataset of random normalized images, with the (id, image, label) items of the image datasets."""
+
+    def __init__(self, num_samples: int, input_size: int, num_classes: int):
+        generator = torch.Generator().manual_seed(0)
+        self.images = torch.randn(
+            num_samples, 3, input_size, input_size, generator=generator
+        )
+        self.labels = torch.randint(num_classes, (num_samples,), generator=generator)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, index):
+        return str(index), self.images[index], self.labels[index]
+
+
+def time_model(model: ImageClassifier, batch_size: int, num_batches: int) -> dict:
+    """
+    Measures the training and prediction throughput of a model on synthetic data,
+    after one warm-up batch.
+
+    Args:
+        model (ImageClassifier): The model to benchmark.
+        batch_size (int): Number of images per batch.
+        num_batches (int): Number of timed batches.
+
+    Returns:
+        dict: Training and prediction step times in milliseconds and throughput in images per second.
+    """
+    dataset = SyntheticImageDataset(
+        num_samples=batch_size * num_batches,
+        input_size=model.input_size,
+        num_classes=model.num_classes,
+    )
+    data = DataLoader(dataset, batch_size=batch_size)
+    warmup = DataLoader(Subset(dataset, range(batch_size)), batch_size=batch_size)
+    model.to_device()
+
+    model.forward_backward(warmup)
+    start_time = time.perf_counter()
+    model.forward_backward(data)
+    train_time = time.perf_counter() - start_time
+
+    model.predict(warmup)
+    start_time = time.perf_counter()
+    model.predict(data)
+    predict_time = time.perf_counter() - start_time
+
+    return {
+        "train_step_ms": train_time / num_batches * 1000,
+        "predict_step_ms": predict_time / num_batches * 1000,
+        "train_images_per_second": len(dataset) / train_time,
+        "predict_images_per_second": len(dataset) / predict_time,
+    }
+
+
+def run_benchmark(
+    model_names: List[str],
+    settings: List[str],
+    batch_size: int,
+    num_batches: int,
+    num_classes: int,
+) -> List[dict]:
+    """
+    Benchmarks the training and prediction throughput of architectures under
+    several settings. A setting is a precision ("float32" runs without autocast,
+    "bfloat16" or "float16"), optionally followed by "+compile" to run the model
+    through `torch.compile` and "+channels_last" to run it in channels_last memory
+    format, e.g. "bfloat16+compile+channels_last".
+
+    Args:
+        model_names (List[str]): Names of the models to benchmark.
+        settings (List[str]): Settings to compare. Speedups are reported relative to the first setting.
+        batch_size (int): Number of images per batch.
+        num_batches (int): Number of timed batches.
+        num_classes (int): Number of output classes of the models.
+
+    Returns:
+        List[dict]: One report per model and setting.
+    """
+    reports = []
+    for model_name in model_names:
+        baseline = None
+        for setting in settings:
+            precision, *options = setting.split("+")
+            model = get_classifier_class(model_name)(
+                model_name=model_name,
+                num_classes=num_classes,
+                mixed_precision=None if precision == "float32" else precision,
+                compile_model="compile" in options,
+                channels_last="channels_last" in options,
+            )
+            report = {"model_name": model_name, "setting": setting}
+            report.update(time_model(model, batch_size, num_batches))
+            # Speedups are relative to the first setting of the model
+            baseline = baseline or report
+            for key in ("train", "predict"):
+                report[f"{key}_speedup"] = (
+                    report[f"{key}_images_per_second"]
+                    / baseline[f"{key}_images_per_second"]
+                )
+            logger.info(
+                f"{model_name} ({setting}): "
+                f"train {report['train_step_ms']:.1f} ms/step "
+                f"({report['train_speedup']:.2f}x), "
+                f"predict {report['predict_step_ms']:.1f} ms/step "
+                f"({report['predict_speedup']:.2f}x)"
+            )
+            reports.append(report)
+    return reports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark training and prediction throughput on synthetic images."
+    )
+    parser.add_argument(
+        "--models", nargs="+", default=["resnet18", "mnasnet1_0", "vgg16"]
+    )
+    parser.add_argument(
+        "--settings", nargs="+", default=["float32", "float32+compile", "bfloat16"]
+    )
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--num-batches", type=int, default=10)
+    parser.add_argument("--num-classes", type=int, default=10)
+    args = parser.parse_args()
+
+    run_benchmark(
+        model_names=args.models,
+        settings=args.settings,
+        batch_size=args.batch_size,
+        num_batches=args.num_batches,
+        num_classes=args.num_classes,
+    )
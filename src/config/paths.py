@@ -36,6 +36,10 @@ SAVED_DATA_LOADER_FILE_PATH = os.path.join(
 PREPROCESSING_DIR_PATH = os.path.join(MODEL_ARTIFACTS_PATH, "preprocessing")
 # Name of the predictor model file inside artifacts directory
 PREDICTOR_DIR_PATH = os.path.join(MODEL_ARTIFACTS_PATH, "predictor")
+# Path to the checkpoint of an unfinished training run
+TRAINING_CHECKPOINT_FILE_PATH = os.path.join(
+    MODEL_PATH, "checkpoints", "training_checkpoint.pt"
+)
 
 # Path to outputs
 OUTPUT_DIR = os.path.join(MODEL_INPUTS_OUTPUTS, "outputs")
@@ -43,6 +47,12 @@ OUTPUT_DIR = os.path.join(MODEL_INPUTS_OUTPUTS, "outputs")
 PREDICTIONS_DIR = os.path.join(OUTPUT_DIR, "predictions")
 # Name of the file containing the predictions
 PREDICTIONS_FILE_PATH = os.path.join(PREDICTIONS_DIR, "predictions.csv")
+# Path to the checkpoint of an unfinished batch prediction run
+PREDICTION_CHECKPOINT_DIR = os.path.join(OUTPUT_DIR, "prediction_checkpoint")
+# Path to the cache of per-image predictions
+PREDICTION_CACHE_FILE_PATH = os.path.join(
+    OUTPUT_DIR, "prediction_cache", "prediction_cache.sqlite"
+)
 
 # Path to logs directory inside outputs directory
 ERRORS_DIR = os.path.join(OUTPUT_DIR, "errors")
@@ -50,6 +60,7 @@ ERRORS_DIR = os.path.join(OUTPUT_DIR, "errors")
 TRAIN_ERROR_FILE_PATH = os.path.join(ERRORS_DIR, "train_error.txt")
 PREDICT_ERROR_FILE_PATH = os.path.join(ERRORS_DIR, "predict_error.txt")
 SERVE_ERROR_FILE_PATH = os.path.join(ERRORS_DIR, "serve_error.txt")
+QUANTIZE_ERROR_FILE_PATH = os.path.join(ERRORS_DIR, "quantize_error.txt")
 
 # Paths inside the source directory
 # Path to source directory
@@ -76,3 +87,13 @@ TRAIN_PREDICTIONS_FILE_PATH = os.path.join(
 VAL_PREDICTIONS_FILE_PATH = os.path.join(
     MODEL_ARTIFACTS_PATH, "validation_predictions.csv"
 )
+
+# Path to the file containing the quantization accuracy report
+QUANTIZATION_REPORT_FILE_PATH = os.path.join(
+    MODEL_ARTIFACTS_PATH, "quantization_report.json"
+)
+
+# Path to the file containing the data loader autotuning report
+DATA_LOADER_AUTOTUNE_REPORT_FILE_PATH = os.path.join(
+    MODEL_ARTIFACTS_PATH, "data_loader_autotune_report.json"
+)
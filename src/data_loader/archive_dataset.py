@@ -0,0 +1,172 @@
+import io
+import os
+import tarfile
+import zipfile
+from pathlib import Path
+from typing import Any, Callable, List, Tuple, Union
+from torch.utils.data import Dataset
+from torchvision.datasets.folder import IMG_EXTENSIONS, has_file_allowed_extension
+
+from data_loader.image_decoding import ImageLoader
+
+ARCHIVE_EXTENSIONS = (".zip", ".tar")
+
+
+def find_archive(data_dir_path: str) -> Union[Tuple[str, str], None]:
+    """
+    Finds the archive holding a dataset directory. The directory is either an
+    archive file, a directory inside an archive (`<archive>/<dir>`), or missing
+    with an archive of the same name next to it (`training.zip` for `training`).
+
+    Args:
+        data_dir_path (str): Path to the dataset directory.
+
+    Returns:
+        Union[Tuple[str, str], None]: The archive path and the directory of the
+            dataset inside the archive ("" for the archive root), or None if the
+            dataset is not in an archive.
+    """
+    if os.path.isdir(data_dir_path):
+        return None
+    for extension in ARCHIVE_EXTENSIONS:
+        if os.path.isfile(data_dir_path + extension):
+            return data_dir_path + extension, ""
+    path = Path(data_dir_path)
+    for parent in [path, *path.parents]:
+        if parent.suffix.lower() in ARCHIVE_EXTENSIONS and parent.is_file():
+            root = "" if parent == path else path.relative_to(parent).as_posix()
+            return str(parent), root
+    return None
+
+
+def is_archive_dataset(data_dir_path: str) -> bool:
+    """Returns whether a dataset directory is read from an archive."""
+    return find_archive(data_dir_path) is not None
+
+
+def list_archive_files(archive_path: str) -> List[Tuple[str, Any]]:
+    """
+    Lists the files of a zip or uncompressed tar archive from its index: the
+    central directory of a zip, or the member headers of a tar.
+
+    Args:
+        archive_path (str): Path to the archive.
+
+    Returns:
+        List[Tuple[str, Any]]: The member name and the location of every file: the
+            ZipInfo of zip members, or the (offset, size) of tar member data.
+    """
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            return [
+                (info.filename, info)
+                for info in archive.infolist()
+                if not info.is_dir()
+            ]
+    try:
+        # Members of compressed tars cannot be read in place
+        with tarfile.open(archive_path, "r:") as archive:
+            return [
+                (member.name, (member.offset_data, member.size))
+                for member in archive.getmembers()
+                if member.isfile()
+            ]
+    except tarfile.ReadError as exc:
+        raise ValueError(
+            f"{archive_path} is not a zip or an uncompressed tar archive."
+        ) from exc
+
+
+class ArchiveImageFolder(Dataset):
+    """
+    Class-folder image dataset read in place from a zip or uncompressed tar
+    archive, without extracting it. Items are (file name, image, label), as for
+    `CustomImageFolder`.
+
+    The classes and files are listed from the archive index. Every process opens
+    its own handle on the archive on first access, so each DataLoader worker
+    reads through a handle of its own.
+    """
+
+    def __init__(
+        self,
+        archive_path: str,
+        root: str = "",
+        transform: Callable = None,
+        loader: ImageLoader = None,
+    ):
+        """
+        Args:
+            archive_path (str): Path to the archive.
+            root (str): Directory of the class folders inside the archive. If empty
+                and the archive holds a top-level directory named after the archive
+                (`training/` in `training.zip`), that directory is used.
+            transform (Callable): Transform applied to every decoded PIL image.
+            loader (ImageLoader): Decodes the images. Defaults to full decoding.
+        """
+        self.archive_path = archive_path
+        self.transform = transform
+        self.loader = loader or ImageLoader()
+        files = list_archive_files(archive_path)
+        if not root:
+            stem = Path(archive_path).stem
+            if any(name.startswith(f"{stem}/") for name, _ in files):
+                root = stem
+        prefix = f"{root.strip('/')}/" if root else ""
+
+        class_files = []
+        for name, location in files:
+            parts = name[len(prefix) :].split("/")
+            if name.startswith(prefix) and len(parts) >= 2:
+                if has_file_allowed_extension(name, IMG_EXTENSIONS):
+                    class_files.append((parts[0], name, location))
+        self.classes = sorted({class_name for class_name, _, _ in class_files})
+        if not self.classes:
+            raise FileNotFoundError(
+                f"Couldn't find any class folder in {archive_path}/{root}."
+            )
+        self.class_to_idx = {name: i for i, name in enumerate(self.classes)}
+
+        class_files.sort(key=lambda item: (self.class_to_idx[item[0]], item[1]))
+        self.samples = [(name, self.class_to_idx[c]) for c, name, _ in class_files]
+        self.locations = [location for _, _, location in class_files]
+        self.imgs = self.samples
+        self.targets = [label for _, label in self.samples]
+        self._archive = None
+        self._pid = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_archive"] = None
+        state["_pid"] = None
+        return state
+
+    def _get_archive(self) -> Any:
+        """Returns this process's handle on the archive, opening it if needed."""
+        if self._archive is None or self._pid != os.getpid():
+            if isinstance(self.locations[0], zipfile.ZipInfo):
+                self._archive = zipfile.ZipFile(self.archive_path)
+            else:
+                self._archive = open(self.archive_path, "rb")
+            self._pid = os.getpid()
+        return self._archive
+
+    def read_bytes(self, index: int) -> bytes:
+        """Returns the encoded bytes of the image at `index`."""
+        archive = self._get_archive()
+        location = self.locations[index]
+        if isinstance(location, zipfile.ZipInfo):
+            return archive.read(location)
+        offset, size = location
+        archive.seek(offset)
+        return archive.read(size)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def __getitem__(self, index: int) -> Tuple[str, Any, int]:
+        image = self.loader(io.BytesIO(self.read_bytes(index)))
+        if self.transform is not None:
+            image = self.transform(image)
+        name, label = self.samples[index]
+        return Path(name).name, image, label
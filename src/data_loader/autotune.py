@@ -0,0 +1,202 @@
+import os
+import time
+import psutil
+import numpy as np
+import torch
+from typing import Dict, List
+from torch.utils.data import Dataset
+
+from data_loader.data_loader import PyTorchDataLoaderFactory, subset_dataset
+from logger import get_logger
+from prediction.predictor_model import ImageClassifier
+from torch_utils.mixed_precision import autocast
+
+logger = get_logger(task_name="autotune")
+
+DEFAULT_BATCH_SIZES = [16, 32, 64, 128, 256]
+
+
+def get_default_num_workers() -> List[int]:
+    """Returns candidate worker counts from 0 up to the number of CPU cores."""
+    num_cpus = os.cpu_count() or 1
+    return sorted({0, 2, 4, num_cpus // 2, num_cpus} & set(range(num_cpus + 1)))
+
+
+def get_memory_usage_mb() -> float:
+    """Returns the resident memory of this process and its loader workers in MB."""
+    process = psutil.Process(os.getpid())
+    memory = process.memory_info().rss
+    for child in process.children(recursive=True):
+        try:
+            memory += child.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return memory / (1024**2)
+
+
+OUT_OF_MEMORY_MESSAGES = ("out of memory", "can't allocate memory")
+
+
+def is_out_of_memory_error(exc: Exception) -> bool:
+    """
+    Returns whether an error raised by a trial means it ran out of memory: a CUDA
+    out-of-memory error, a `MemoryError`, or a RuntimeError of the CUDA or CPU
+    allocator ("DefaultCPUAllocator: can't allocate memory").
+    """
+    if isinstance(exc, (torch.cuda.OutOfMemoryError, MemoryError)):
+        return True
+    return any(message in str(exc) for message in OUT_OF_MEMORY_MESSAGES)
+
+
+def run_trial(
+    factory: PyTorchDataLoaderFactory,
+    dataset: Dataset,
+    model: ImageClassifier,
+    batch_size: int,
+    num_workers: int,
+    num_batches: int,
+) -> Dict[str, float]:
+    """
+    Times loading and a forward and backward pass of the model over `num_batches`
+    batches, after one warm-up batch that also starts the loader workers.
+
+    Args:
+        factory (PyTorchDataLoaderFactory): The factory creating the data loader.
+        dataset (Dataset): The dataset to draw the trial batches from.
+        model (ImageClassifier): The model to train. Its weights are not updated.
+        batch_size (int): The batch size to try.
+        num_workers (int): The number of loader workers to try.
+        num_batches (int): The number of timed batches.
+
+    Returns:
+        Dict[str, float]: The throughput in images per second and the peak memory in MB.
+    """
+    num_samples = min(len(dataset), batch_size * (num_batches + 1))
+    factory.batch_size = batch_size
+    factory.num_workers = num_workers
+    data = factory.create_data_loader(
+        subset_dataset(dataset, range(num_samples)), False
+    )
+
+    forward_model = model.get_forward_model()
+    peak_memory = get_memory_usage_mb()
+    num_images = 0
+    start_time = None
+    for i, (_, inputs, labels) in enumerate(data):
+        inputs, labels = model.prepare_inputs(inputs), labels.to(model.device)
+        with autocast(model.device, model.autocast_dtype):
+            outputs = forward_model(inputs)
+            if isinstance(outputs, tuple):
+                outputs = outputs[0]
+            loss = model.loss_function(outputs, labels)
+        loss.backward()
+        model.model.zero_grad(set_to_none=True)
+        peak_memory = max(peak_memory, get_memory_usage_mb())
+        if i == 0:
+            start_time = time.perf_counter()
+        else:
+            num_images += len(labels)
+    elapsed_time = time.perf_counter() - start_time
+    return {
+        "images_per_second": num_images / elapsed_time if num_images else 0.0,
+        "peak_memory_mb": peak_memory,
+    }
+
+
+def autotune_data_loader_factory(
+    factory: PyTorchDataLoaderFactory,
+    dataset: Dataset,
+    model: ImageClassifier,
+    batch_sizes: List[int] = None,
+    num_workers: List[int] = None,
+    memory_budget_mb: float = None,
+    num_trial_batches: int = 5,
+) -> Dict:
+    """
+    Picks the batch size and number of loader workers with the highest training
+    throughput of loader and model, and sets them on the factory so they are saved
+    with it and reused for prediction. Trials run the forward and backward passes
+    of the model with its mixed precision, memory format and compile settings.
+    The BatchNorm statistics the trials update are reset afterwards, so the model
+    can then be trained as if it had not been used.
+
+    Every combination of the candidates runs a short trial. Configurations whose
+    peak memory (this process and its workers, in MB) exceeds the budget, or that
+    run out of memory, are discarded, as are all larger batch sizes with the same
+    worker count.
+
+    Args:
+        factory (PyTorchDataLoaderFactory): The factory to tune.
+        dataset (Dataset): The training dataset to draw trial batches from.
+        model (ImageClassifier): The model to be trained. Its weights are not updated.
+        batch_sizes (List[int]): Candidate batch sizes. Defaults to DEFAULT_BATCH_SIZES.
+        num_workers (List[int]): Candidate worker counts. Defaults to counts up to the number of CPU cores.
+        memory_budget_mb (float): Memory budget in MB. Defaults to 80% of the available memory.
+        num_trial_batches (int): Number of timed batches per trial.
+
+    Returns:
+        Dict: The chosen batch size and number of workers, and the trial results.
+    """
+    batch_sizes = sorted(batch_sizes or DEFAULT_BATCH_SIZES)
+    num_workers = sorted(num_workers or get_default_num_workers())
+    if memory_budget_mb is None:
+        memory_budget_mb = 0.8 * psutil.virtual_memory().available / (1024**2)
+    buffers = {
+        name: buffer.detach().clone() for name, buffer in model.model.named_buffers()
+    }
+    model.to_device()
+    model.model.train()
+
+    trials = []
+    try:
+        for workers in num_workers:
+            for batch_size in batch_sizes:
+                try:
+                    result = run_trial(
+                        factory=factory,
+                        dataset=dataset,
+                        model=model,
+                        batch_size=batch_size,
+                        num_workers=workers,
+                        num_batches=num_trial_batches,
+                    )
+                except (RuntimeError, MemoryError) as exc:
+                    if not is_out_of_memory_error(exc):
+                        raise
+                    # Larger batches would run out of memory as well, so the
+                    # batch size sweep of this worker count ends here
+                    logger.info(
+                        f"batch_size={batch_size}, num_workers={workers}: {exc}"
+                    )
+                    break
+                finally:
+                    if torch.cuda.is_available():
+                        torch.cuda.empty_cache()
+                trial = {"batch_size": batch_size, "num_workers": workers, **result}
+                logger.info(
+                    f"batch_size={batch_size}, num_workers={workers}: "
+                    f"{result['images_per_second']:.1f} images/s, "
+                    f"{result['peak_memory_mb']:.0f} MB"
+                )
+                if result["peak_memory_mb"] > memory_budget_mb:
+                    break
+                trials.append(trial)
+    finally:
+        with torch.no_grad():
+            for name, buffer in model.model.named_buffers():
+                buffer.copy_(buffers[name])
+
+    if not trials:
+        raise ValueError(
+            f"No batch size and worker count fits the memory budget of "
+            f"{memory_budget_mb:.0f} MB."
+        )
+    best = trials[int(np.argmax([t["images_per_second"] for t in trials]))]
+    factory.batch_size = best["batch_size"]
+    factory.num_workers = best["num_workers"]
+    return {
+        "batch_size": best["batch_size"],
+        "num_workers": best["num_workers"],
+        "memory_budget_mb": memory_budget_mb,
+        "trials": trials,
+    }
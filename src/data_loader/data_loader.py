@@ -1,19 +1,85 @@
 import os
+import hashlib
 import joblib
-from typing import Tuple, Union
+from functools import partial
+from typing import Callable, Collection, Dict, List, Tuple, Union
 from pathlib import Path
 import numpy as np
-from torch.utils.data import DataLoader, Subset
+import torch
+from PIL import Image
+from torch.utils.data import DataLoader, Dataset, Sampler, Subset
 from torchvision.datasets import ImageFolder
+from torchvision.datasets.folder import has_file_allowed_extension
 from torchvision import transforms
 
+from data_loader.archive_dataset import ArchiveImageFolder, find_archive
 from data_loader.base_loader import AbstractDataLoaderFactory
+from data_loader.image_cache import ImageCache
+from data_loader.image_decoding import ImageLoader, get_draft_size
+from data_loader.manifest import DatasetManifest
+from data_loader.packed_shards import (
+    PACKED_INDEX_FILE_NAME,
+    PackedShardDataset,
+    is_packed_dataset,
+)
+from torch_utils.sampling import create_weighted_sampler, get_class_sampling_weights
 
 
 class CustomImageFolder(ImageFolder):
+    def __init__(
+        self,
+        root: str,
+        transform=None,
+        image_cache_dir: str = None,
+        manifest_dir: str = None,
+        loader: ImageLoader = None,
+    ):
+        self.manifest = None
+        if manifest_dir is not None:
+            self.manifest = DatasetManifest(root=root, manifest_dir=manifest_dir)
+        super(CustomImageFolder, self).__init__(
+            root=root, transform=transform, loader=loader or ImageLoader()
+        )
+        self.image_cache = None
+        if image_cache_dir is not None:
+            # The cache stats the files itself: the manifest does not detect files
+            # overwritten in place
+            self.image_cache = ImageCache(
+                cache_dir=image_cache_dir,
+                root=root,
+                samples=self.samples,
+                transform=transform,
+                loader=self.loader,
+            )
+
+    def find_classes(self, directory: str) -> Tuple[List[str], Dict[str, int]]:
+        if self.manifest is None:
+            return super(CustomImageFolder, self).find_classes(directory)
+        return self.manifest.find_classes()
+
+    def make_dataset(
+        self,
+        directory: str,
+        class_to_idx: Dict[str, int],
+        extensions: Tuple[str, ...] = None,
+        is_valid_file: Callable[[str], bool] = None,
+    ) -> List[Tuple[str, int]]:
+        if self.manifest is None:
+            return super(CustomImageFolder, self).make_dataset(
+                directory, class_to_idx, extensions, is_valid_file
+            )
+        if is_valid_file is None:
+            is_valid_file = partial(has_file_allowed_extension, extensions=extensions)
+        # Read the directory listing from the manifest instead of walking the tree
+        return self.manifest.make_dataset(class_to_idx, is_valid_file)
+
     def __getitem__(self, index):
-        # Call the parent class's __getitem__ to retrieve image and label
-        original_tuple = super(CustomImageFolder, self).__getitem__(index)
+        if self.image_cache is not None:
+            # Read the decoded and cropped image from the cache
+            original_tuple = (self.image_cache[index], self.targets[index])
+        else:
+            # Call the parent class's __getitem__ to retrieve image and label
+            original_tuple = super(CustomImageFolder, self).__getitem__(index)
         # Retrieve the path from self.imgs, which stores tuples of (path, class_index)
         path, _ = self.imgs[index]
         # Return a tuple with the filename, image, and label
@@ -21,29 +87,338 @@ class CustomImageFolder(ImageFolder):
         return (Path(path).name, *original_tuple)
 
 
+def normalize_images(
+    images: torch.Tensor,
+    mean: torch.Tensor,
+    std: torch.Tensor,
+    memory_format: torch.memory_format = torch.preserve_format,
+    pin_memory: bool = False,
+) -> torch.Tensor:
+    """
+    Converts a batch of uint8 NCHW images to float and normalizes it in place.
+
+    Args:
+        images (torch.Tensor): The uint8 images.
+        mean (torch.Tensor): Per-channel mean, shaped (1, C, 1, 1).
+        std (torch.Tensor): Per-channel standard deviation, shaped (1, C, 1, 1).
+        memory_format (torch.memory_format): Memory format of the float images. The
+            layout change is part of the float conversion copy.
+        pin_memory (bool): Whether to convert into page-locked memory, so the batch
+            can be copied to the GPU asynchronously.
+
+    Returns:
+        torch.Tensor: The normalized float32 images.
+    """
+    if pin_memory:
+        pinned = torch.empty_like(
+            images, dtype=torch.float32, memory_format=memory_format, pin_memory=True
+        )
+        images = pinned.copy_(images)
+    else:
+        images = images.to(torch.float32, memory_format=memory_format)
+    return images.div_(255).sub_(mean).div_(std)
+
+
+def init_worker(worker_id: int, num_threads: int) -> None:
+    """
+    Caps the number of threads of a data loader worker, so the workers together do
+    not oversubscribe the cores. Applies to PyTorch intra-op threads, OpenMP and
+    MKL pools started in the worker, and OpenCV if it is installed.
+
+    Args:
+        worker_id (int): Index of the worker, passed by the DataLoader.
+        num_threads (int): Number of threads per worker.
+    """
+    os.environ["OMP_NUM_THREADS"] = str(num_threads)
+    os.environ["MKL_NUM_THREADS"] = str(num_threads)
+    torch.set_num_threads(num_threads)
+    try:
+        import cv2
+    except ImportError:
+        return
+    cv2.setNumThreads(num_threads)
+
+
+def subset_dataset(dataset: Dataset, indices: Collection[int]) -> Dataset:
+    """Returns the subset of a dataset at the given indices."""
+    if isinstance(dataset, PackedShardDataset):
+        return dataset.subset(indices)
+    return Subset(dataset, indices)
+
+
+def get_dataset_fingerprint(data_dir_path: str, dataset: Dataset) -> str:
+    """
+    Returns a fingerprint of a dataset, to tell whether it was replaced: a hash of
+    its location, the size and modification time of its directory, archive or
+    packed index, and its (file, class index) samples. Only the dataset listing
+    is read, no image file is stat-ed.
+
+    Args:
+        data_dir_path (str): Path to the dataset directory.
+        dataset (Dataset): The dataset built from the directory.
+
+    Returns:
+        str: The fingerprint.
+    """
+    archive = find_archive(data_dir_path)
+    if archive is not None:
+        source = archive[0]
+    elif is_packed_dataset(data_dir_path):
+        source = os.path.join(data_dir_path, PACKED_INDEX_FILE_NAME)
+    else:
+        source = data_dir_path
+    stat = os.stat(source)
+    key = f"{os.path.abspath(data_dir_path)}\t{stat.st_size}\t{stat.st_mtime_ns}\n"
+    digest = hashlib.sha1(key.encode("utf-8"))
+    for path, label in dataset.imgs:
+        digest.update(f"{path}\t{label}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def get_memory_format(channels_last: bool) -> torch.memory_format:
+    """Returns the memory format for normalized images."""
+    return torch.channels_last if channels_last else torch.preserve_format
+
+
+class NormalizingDataLoader(DataLoader):
+    """
+    DataLoader over datasets that return uint8 CHW images. Workers only decode and
+    crop; the float conversion and mean/std normalization run once per batch as a
+    vectorized op in the main process, which keeps the batches shipped from the
+    workers at a quarter of the float32 size. With `channels_last`, the normalized
+    batches are produced in channels_last memory format. With `pin_memory`, the
+    normalized batches, rather than the uint8 batches, are put in page-locked memory.
+    """
+
+    def __init__(
+        self,
+        *args,
+        mean: List[float],
+        std: List[float],
+        channels_last: bool = False,
+        pin_memory: bool = False,
+        **kwargs,
+    ):
+        self.mean = torch.tensor(mean, dtype=torch.float32).view(1, -1, 1, 1)
+        self.std = torch.tensor(std, dtype=torch.float32).view(1, -1, 1, 1)
+        self.memory_format = get_memory_format(channels_last)
+        self.pin_batches = pin_memory
+        self.loader_kwargs = {
+            "mean": mean,
+            "std": std,
+            "channels_last": channels_last,
+            "pin_memory": pin_memory,
+            **kwargs,
+        }
+        super().__init__(*args, **kwargs)
+
+    def sequential(self) -> "NormalizingDataLoader":
+        """
+        Returns a loader with the same settings over the same dataset that reads
+        it once in order, without the shuffling or sampler of this loader.
+        """
+        kwargs = {
+            key: value
+            for key, value in self.loader_kwargs.items()
+            if key not in ("shuffle", "sampler")
+        }
+        return NormalizingDataLoader(self.dataset, shuffle=False, **kwargs)
+
+    def __iter__(self):
+        for ids, images, labels in super().__iter__():
+            images = normalize_images(
+                images, self.mean, self.std, self.memory_format, self.pin_batches
+            )
+            yield ids, images, labels
+
+
 class PyTorchDataLoaderFactory(AbstractDataLoaderFactory):
     def __init__(
         self,
         batch_size: int,
         num_workers: int,
         transforms: transforms.Compose,
+        mean: List[float],
+        std: List[float],
         validation_size: float = 0.0,
         shuffle_train=True,
         random_state: int = 42,
+        image_cache_dir: str = None,
+        dataset_manifest_dir: str = None,
+        channels_last: bool = False,
+        persistent_workers: bool = False,
+        prefetch_factor: int = None,
+        pin_memory: bool = None,
+        worker_num_threads: int = None,
+        shuffle_buffer_size: int = 1000,
+        jpeg_draft: bool = False,
+        sampling: str = None,
+        class_weights: Dict[str, float] = None,
     ):
         self.batch_size = batch_size
         self.num_workers = num_workers
         self.validation_size = validation_size
         self.transform = transforms
+        self.mean = mean
+        self.std = std
         self.num_classes = None
         self.shuffle_train = shuffle_train
         self.random_state = random_state
+        self.image_cache_dir = image_cache_dir
+        self.dataset_manifest_dir = dataset_manifest_dir
+        self.channels_last = channels_last
+        self.persistent_workers = persistent_workers
+        self.prefetch_factor = prefetch_factor
+        self.pin_memory = pin_memory
+        self.worker_num_threads = worker_num_threads
+        self.shuffle_buffer_size = shuffle_buffer_size
+        self.jpeg_draft = jpeg_draft
+        self.sampling = sampling
+        self.class_weights = class_weights
+        self.class_sampling_weights = None
         self.num_classes = None
 
+    def create_data_loader(
+        self, dataset: Dataset, shuffle: bool, sampler: Sampler = None
+    ) -> DataLoader:
+        """
+        Create a DataLoader that batches the uint8 images of the dataset and
+        normalizes each batch.
+
+        The worker options (`persistent_workers`, `prefetch_factor` and the worker
+        thread cap) only apply when `num_workers` is above 0. Memory is pinned when
+        `pin_memory` is set, or, if it is None, when CUDA is available. Packed
+        datasets shuffle themselves, by shard and through a shuffle buffer; since a
+        worker then reads whole shards, there are at most as many workers as shards.
+
+        Args:
+            dataset: The dataset to load.
+            shuffle: Whether to shuffle the dataset every epoch.
+            sampler: Optional sampler that draws the samples instead of shuffling.
+
+        Returns:
+            A DataLoader for the dataset.
+        """
+        num_workers = self.num_workers
+        if isinstance(dataset, PackedShardDataset):
+            if sampler is not None:
+                raise ValueError("Packed shard datasets do not support samplers.")
+            if shuffle:
+                # Workers beyond the shard count would get no shards to read
+                num_workers = min(num_workers, dataset.num_shards)
+            dataset = dataset.for_loader(
+                shuffle=shuffle,
+                batch_size=self.batch_size,
+                shuffle_buffer_size=self.shuffle_buffer_size,
+                random_state=self.random_state,
+            )
+            shuffle = False
+        worker_kwargs = {}
+        if num_workers > 0:
+            worker_kwargs = {
+                "persistent_workers": self.persistent_workers,
+                "prefetch_factor": self.prefetch_factor,
+                "worker_init_fn": (
+                    None
+                    if self.worker_num_threads is None
+                    else partial(init_worker, num_threads=self.worker_num_threads)
+                ),
+            }
+        pin_memory = self.pin_memory
+        if pin_memory is None:
+            pin_memory = torch.cuda.is_available()
+        return NormalizingDataLoader(
+            dataset,
+            batch_size=self.batch_size,
+            shuffle=shuffle,
+            num_workers=num_workers,
+            mean=self.mean,
+            std=self.std,
+            channels_last=self.channels_last,
+            pin_memory=pin_memory,
+            sampler=sampler,
+            **worker_kwargs,
+        )
+
+    def create_train_data_loader(
+        self, dataset: Dataset, targets: np.ndarray
+    ) -> DataLoader:
+        """
+        Create the DataLoader of the training data. If `sampling` or
+        `class_weights` is set, the samples are drawn with replacement with the
+        weight of their class. The class weights are computed from the class sizes
+        on the first call and stored with the factory. Otherwise, the samples are
+        shuffled if `shuffle_train` is set.
+
+        Args:
+            dataset: The training dataset.
+            targets: The class index of every sample of the dataset.
+
+        Returns:
+            A DataLoader for the training data.
+        """
+        if self.sampling is None and self.class_weights is None:
+            return self.create_data_loader(dataset, shuffle=self.shuffle_train)
+        if self.class_sampling_weights is None:
+            class_weights = None
+            if self.class_weights is not None:
+                class_weights = [
+                    self.class_weights.get(c, 1.0) for c in self.class_names
+                ]
+            self.class_sampling_weights = get_class_sampling_weights(
+                class_counts=np.bincount(targets, minlength=self.num_classes),
+                sampling=self.sampling,
+                class_weights=class_weights,
+            )
+        sampler = create_weighted_sampler(targets, self.class_sampling_weights)
+        return self.create_data_loader(dataset, shuffle=False, sampler=sampler)
+
+    def get_image_loader(self) -> ImageLoader:
+        """
+        Create the image loader of the datasets. With `jpeg_draft`, JPEGs are
+        decoded at the smallest reduced scale that still covers the `Resize` size
+        of the transform.
+
+        Returns:
+            The image loader.
+        """
+        if not self.jpeg_draft:
+            return ImageLoader()
+        return ImageLoader(draft_size=get_draft_size(self.transform))
+
+    def transform_image(self, image: Image.Image) -> torch.Tensor:
+        """
+        Apply the dataset transforms to an in-memory image.
+
+        Args:
+            image: The opened image. Decoded the way the datasets decode images if
+                   it is not loaded yet.
+
+        Returns:
+            The uint8 CHW image, as returned by the datasets.
+        """
+        return self.transform(self.get_image_loader().convert(image))
+
+    def normalize(self, images: torch.Tensor) -> torch.Tensor:
+        """
+        Normalize a batch of transformed uint8 images the way the data loaders do.
+
+        Args:
+            images: The uint8 NCHW images.
+
+        Returns:
+            The normalized float32 images.
+        """
+        mean = torch.tensor(self.mean, dtype=torch.float32).view(1, -1, 1, 1)
+        std = torch.tensor(self.std, dtype=torch.float32).view(1, -1, 1, 1)
+        memory_format = get_memory_format(self.channels_last)
+        return normalize_images(images, mean, std, memory_format)
+
     def create_train_and_valid_data_loaders(
         self,
         train_dir_path: str,
         validation_dir_path: str = None,
+        train_dataset: Dataset = None,
     ) -> Tuple[DataLoader, Union[DataLoader, None]]:
         """
         Creates DataLoader objects for training and, if specified, validation datasets.
@@ -60,13 +435,17 @@ class PyTorchDataLoaderFactory(AbstractDataLoaderFactory):
                                 If provided, the validation dataset is loaded from this
                                 directory. Otherwise, a validation split can be created
                                 from the training dataset.
+            train_dataset: Optional; dataset from `create_dataset` to reuse instead of
+                           listing the training dataset directory again.
         Returns:
             A tuple of DataLoaders for the training and validation datasets.
             The validation DataLoader is None if no validation dataset is provided or
             created.
         """
 
-        dataset = CustomImageFolder(root=train_dir_path, transform=self.transform)
+        dataset = train_dataset
+        if dataset is None:
+            dataset = self.create_dataset(train_dir_path)
         self.class_to_idx = dataset.class_to_idx
         self.num_classes = len(dataset.classes)
         self.class_names = dataset.classes
@@ -75,20 +454,10 @@ class PyTorchDataLoaderFactory(AbstractDataLoaderFactory):
 
         # if validation data is given to us directly then load it
         if validation_dir_path is not None:
-            validation_dataset = CustomImageFolder(
-                root=validation_dir_path, transform=self.transform
-            )
-            val_loader = DataLoader(
-                validation_dataset,
-                batch_size=self.batch_size,
-                shuffle=False,
-                num_workers=self.num_workers,
-            )
-            train_loader = DataLoader(
-                dataset,
-                batch_size=self.batch_size,
-                shuffle=self.shuffle_train,
-                num_workers=self.num_workers,
+            validation_dataset = self.create_dataset(validation_dir_path)
+            val_loader = self.create_data_loader(validation_dataset, shuffle=False)
+            train_loader = self.create_train_data_loader(
+                dataset, np.asarray(dataset.targets)
             )
             self.train_image_names = [Path(i[0]).name for i in dataset.imgs]
             self.val_image_names = [Path(i[0]).name for i in validation_dataset.imgs]
@@ -99,50 +468,40 @@ class PyTorchDataLoaderFactory(AbstractDataLoaderFactory):
             if self.validation_size > 0:
                 # Create validation split out of train split
 
-                # Manual implementation of stratified sampling
-                np.random.seed(self.random_state)
-                targets = np.array(dataset.targets)
-                classes, _ = np.unique(targets, return_counts=True)
-                class_indices = [np.where(targets == i)[0] for i in classes]
-
-                train_indices, val_indices = [], []
-                for indices in class_indices:
-                    np.random.shuffle(indices)
-                    split = int(len(indices) * self.validation_size)
-                    val_indices.extend(indices[:split])
-                    train_indices.extend(indices[split:])
-
-                train_subset = Subset(dataset, train_indices)
-                val_subset = Subset(dataset, val_indices)
-
-                train_loader = DataLoader(
-                    train_subset,
-                    batch_size=self.batch_size,
-                    shuffle=self.shuffle_train,
-                    num_workers=self.num_workers,
+                # Stratified split: the first validation_size of every class,
+                # in random order, goes to the validation split
+                targets = np.asarray(dataset.targets)
+                rng = np.random.default_rng(self.random_state)
+                order = rng.permutation(len(targets))
+                order = order[np.argsort(targets[order], kind="stable")]
+                class_counts = np.bincount(targets)
+                class_starts = np.cumsum(class_counts) - class_counts
+                rank_in_class = np.arange(len(order)) - np.repeat(
+                    class_starts, class_counts
                 )
-                val_loader = DataLoader(
-                    val_subset,
-                    batch_size=self.batch_size,
-                    shuffle=False,
-                    num_workers=self.num_workers,
+                num_val = (class_counts * self.validation_size).astype(np.int64)
+                is_val = rank_in_class < np.repeat(num_val, class_counts)
+                train_indices, val_indices = order[~is_val], order[is_val]
+
+                train_subset = subset_dataset(dataset, train_indices)
+                val_subset = subset_dataset(dataset, val_indices)
+
+                train_loader = self.create_train_data_loader(
+                    train_subset, targets[train_indices]
                 )
-                self.train_image_names = [
-                    Path(dataset.imgs[i][0]).name for i in train_indices
-                ]
-                self.val_image_names = [
-                    Path(dataset.imgs[i][0]).name for i in val_indices
-                ]
-                self.train_image_labels = [dataset.imgs[i][1] for i in train_indices]
-                self.val_image_labels = [dataset.imgs[i][1] for i in val_indices]
+                val_loader = self.create_data_loader(val_subset, shuffle=False)
+                image_names = np.array(
+                    [os.path.basename(path) for path, _ in dataset.imgs], dtype=object
+                )
+                self.train_image_names = image_names[train_indices].tolist()
+                self.val_image_names = image_names[val_indices].tolist()
+                self.train_image_labels = targets[train_indices].tolist()
+                self.val_image_labels = targets[val_indices].tolist()
             else:
                 # No validation data to use
                 val_loader = None
-                train_loader = DataLoader(
-                    dataset,
-                    batch_size=self.batch_size,
-                    shuffle=self.shuffle_train,
-                    num_workers=self.num_workers,
+                train_loader = self.create_train_data_loader(
+                    dataset, np.asarray(dataset.targets)
                 )
                 self.train_image_names = [Path(i[0]).name for i in dataset.imgs]
                 self.val_image_names = None
@@ -154,26 +513,109 @@ class PyTorchDataLoaderFactory(AbstractDataLoaderFactory):
             self.val_image_labels = [idx_to_class[i] for i in self.val_image_labels]
         return train_loader, val_loader
 
-    def create_test_data_loader(self, data_dir_path: str):
+    def create_dataset(self, data_dir_path: str) -> Dataset:
+        """
+        Create the dataset of a dataset directory: a `PackedShardDataset` if the
+        directory holds packed shards, an `ArchiveImageFolder` if it is read from a
+        zip or tar archive (see `find_archive`), else a `CustomImageFolder`.
+
+        Args:
+            data_dir_path: Path to the dataset directory.
+
+        Returns:
+            The dataset.
+        """
+        loader = self.get_image_loader()
+        if is_packed_dataset(data_dir_path):
+            return PackedShardDataset(
+                root=data_dir_path, transform=self.transform, loader=loader
+            )
+        archive = find_archive(data_dir_path)
+        if archive is not None:
+            archive_path, root = archive
+            return ArchiveImageFolder(
+                archive_path=archive_path,
+                root=root,
+                transform=self.transform,
+                loader=loader,
+            )
+        return CustomImageFolder(
+            root=data_dir_path,
+            transform=self.transform,
+            image_cache_dir=self.image_cache_dir,
+            manifest_dir=self.dataset_manifest_dir,
+            loader=loader,
+        )
+
+    def create_test_dataset(self, data_dir_path: str) -> Dataset:
+        """
+        Create the dataset of the test images.
+
+        Args:
+            data_dir_path: Path to the test dataset directory.
+
+        Returns:
+            The test dataset.
+        """
+        return self.create_dataset(data_dir_path)
+
+    def create_test_data_loader(
+        self,
+        data_dir_path: str,
+        num_shards: int = 1,
+        shard_index: int = 0,
+        skip_image_names: Collection[str] = None,
+        test_dataset: Dataset = None,
+    ):
         """
         Create a PyTorch DataLoader for test data.
 
         Args:
             data_dir_path: Path to the test dataset directory.
+            num_shards: Number of contiguous shards the test dataset is split into.
+            shard_index: Index of the shard to load.
+            skip_image_names: Names of images to leave out, such as images that
+                              were already scored. Applied before sharding.
+            test_dataset: Dataset from `create_test_dataset` to reuse instead of
+                          listing the test dataset directory again.
 
         Returns:
-            A DataLoader for test data.
+            A DataLoader for test data and the names of the images it loads.
         """
-        test_dataset = CustomImageFolder(root=data_dir_path, transform=self.transform)
-        test_loader = DataLoader(
-            test_dataset,
-            batch_size=self.batch_size,
-            shuffle=False,
-            num_workers=self.num_workers,
-        )
+        if test_dataset is None:
+            test_dataset = self.create_test_dataset(data_dir_path)
         image_names = [Path(i[0]).name for i in test_dataset.imgs]
+        indices = np.arange(len(test_dataset))
+        if skip_image_names:
+            keep = [name not in skip_image_names for name in image_names]
+            indices = indices[np.array(keep, dtype=bool)]
+        if num_shards > 1:
+            indices = np.array_split(indices, num_shards)[shard_index]
+        if len(indices) < len(test_dataset):
+            test_dataset = subset_dataset(test_dataset, indices)
+            image_names = [image_names[i] for i in indices]
+        test_loader = self.create_data_loader(test_dataset, shuffle=False)
         return test_loader, image_names
 
+    def build_image_cache(self, data_dir_path: str) -> None:
+        """
+        Decode, resize and crop every image of a dataset directory into the image
+        cache ahead of training or prediction.
+
+        Args:
+            data_dir_path: Path to the dataset directory.
+        """
+        if self.image_cache_dir is None:
+            raise ValueError("No image_cache_dir is set for this data loader factory.")
+        dataset = CustomImageFolder(
+            root=data_dir_path,
+            transform=self.transform,
+            image_cache_dir=self.image_cache_dir,
+            manifest_dir=self.dataset_manifest_dir,
+            loader=self.get_image_loader(),
+        )
+        dataset.image_cache.build()
+
     def save(self, file_path: str) -> None:
         """
         Save the data loader factory to a file.
@@ -226,10 +668,11 @@ class OrdinaryDataLoader(PyTorchDataLoaderFactory):
         [
             transforms.Resize(256),
             transforms.CenterCrop(224),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+            transforms.PILToTensor(),
         ]
     )
+    MEAN = [0.485, 0.456, 0.406]
+    STD = [0.229, 0.224, 0.225]
 
     def __init__(
         self,
@@ -238,14 +681,38 @@ class OrdinaryDataLoader(PyTorchDataLoaderFactory):
         shuffle_train=True,
         num_workers: int = 0,
         random_state: int = 42,
+        image_cache_dir: str = None,
+        dataset_manifest_dir: str = None,
+        channels_last: bool = False,
+        persistent_workers: bool = False,
+        prefetch_factor: int = None,
+        pin_memory: bool = None,
+        worker_num_threads: int = None,
+        shuffle_buffer_size: int = 1000,
+        jpeg_draft: bool = False,
+        sampling: str = None,
+        class_weights: Dict[str, float] = None,
     ):
         super().__init__(
             batch_size=batch_size,
             num_workers=num_workers,
             transforms=self.TRANSFORMS,
+            mean=self.MEAN,
+            std=self.STD,
             validation_size=validation_size,
             shuffle_train=shuffle_train,
             random_state=random_state,
+            image_cache_dir=image_cache_dir,
+            dataset_manifest_dir=dataset_manifest_dir,
+            channels_last=channels_last,
+            persistent_workers=persistent_workers,
+            prefetch_factor=prefetch_factor,
+            pin_memory=pin_memory,
+            worker_num_threads=worker_num_threads,
+            shuffle_buffer_size=shuffle_buffer_size,
+            jpeg_draft=jpeg_draft,
+            sampling=sampling,
+            class_weights=class_weights,
         )
 
 
@@ -254,10 +721,11 @@ class InceptionV3DataLoader(PyTorchDataLoaderFactory):
         [
             transforms.Resize(299),
             transforms.CenterCrop(299),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+            transforms.PILToTensor(),
         ]
     )
+    MEAN = [0.485, 0.456, 0.406]
+    STD = [0.229, 0.224, 0.225]
 
     def __init__(
         self,
@@ -266,12 +734,36 @@ class InceptionV3DataLoader(PyTorchDataLoaderFactory):
         shuffle_train=True,
         num_workers: int = 0,
         random_state: int = 42,
+        image_cache_dir: str = None,
+        dataset_manifest_dir: str = None,
+        channels_last: bool = False,
+        persistent_workers: bool = False,
+        prefetch_factor: int = None,
+        pin_memory: bool = None,
+        worker_num_threads: int = None,
+        shuffle_buffer_size: int = 1000,
+        jpeg_draft: bool = False,
+        sampling: str = None,
+        class_weights: Dict[str, float] = None,
     ):
         super().__init__(
             batch_size=batch_size,
             num_workers=num_workers,
             transforms=self.TRANSFORMS,
+            mean=self.MEAN,
+            std=self.STD,
             validation_size=validation_size,
             shuffle_train=shuffle_train,
             random_state=random_state,
+            image_cache_dir=image_cache_dir,
+            dataset_manifest_dir=dataset_manifest_dir,
+            channels_last=channels_last,
+            persistent_workers=persistent_workers,
+            prefetch_factor=prefetch_factor,
+            pin_memory=pin_memory,
+            worker_num_threads=worker_num_threads,
+            shuffle_buffer_size=shuffle_buffer_size,
+            jpeg_draft=jpeg_draft,
+            sampling=sampling,
+            class_weights=class_weights,
         )
@@ -0,0 +1,195 @@
+import os
+import hashlib
+import joblib
+import numpy as np
+import torch
+from typing import Any, Callable, List, Tuple
+from torchvision import transforms
+
+
+class ArrayToTensor:
+    """Converts a uint8 HWC array into a uint8 CHW tensor without copying."""
+
+    def __call__(self, image: np.ndarray) -> torch.Tensor:
+        return torch.from_numpy(image).permute(2, 0, 1)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}()"
+
+
+def split_transform(
+    transform: transforms.Compose,
+) -> Tuple[transforms.Compose, transforms.Compose]:
+    """
+    Splits a transform pipeline into the deterministic PIL part that runs before
+    `ToTensor`/`PILToTensor` and the tensor part that starts there. In the tensor
+    part, `PILToTensor` is swapped for `ArrayToTensor` so it applies to the cached
+    arrays.
+
+    Args:
+        transform (transforms.Compose): The full transform pipeline.
+
+    Returns:
+        Tuple[transforms.Compose, transforms.Compose]: The (pre, post) pipelines.
+
+    Raises:
+        ValueError: If the pipeline has no `ToTensor` or `PILToTensor` step.
+    """
+    steps = list(transform.transforms)
+    for i, step in enumerate(steps):
+        if isinstance(step, transforms.ToTensor):
+            return transforms.Compose(steps[:i]), transforms.Compose(steps[i:])
+        if isinstance(step, transforms.PILToTensor):
+            post = [ArrayToTensor(), *steps[i + 1 :]]
+            return transforms.Compose(steps[:i]), transforms.Compose(post)
+    raise ValueError(
+        "Image caching requires a transform pipeline with ToTensor or PILToTensor."
+    )
+
+
+class ImageCache:
+    """
+    On-disk cache of decoded, resized and cropped images.
+
+    Every image of a dataset is stored as a uint8 HWC array in one memory-mapped
+    file, indexed by its position in the dataset. Entries are filled on first
+    access (from any DataLoader worker) or by `build`, and are invalidated when the
+    source file's size or modification time changes. The whole cache is rebuilt
+    when the number of samples, the cached part of the transform or the image
+    loader changes.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        root: str,
+        samples: List[Tuple[str, int]],
+        transform: transforms.Compose,
+        loader: Callable[[str], Any],
+    ):
+        """
+        Args:
+            cache_dir (str): Directory where the cache files are stored.
+            root (str): Root directory of the dataset, used to name the cache files.
+            samples (List[Tuple[str, int]]): The (path, class_index) samples of the dataset.
+            transform (transforms.Compose): The full transform pipeline of the dataset.
+            loader (Callable[[str], Any]): Function that loads an image from a path.
+        """
+        self.pre_transform, self.post_transform = split_transform(transform)
+        self.loader = loader
+        self.paths = [path for path, _ in samples]
+
+        os.makedirs(cache_dir, exist_ok=True)
+        key = hashlib.sha1(os.path.abspath(root).encode("utf-8")).hexdigest()
+        self.images_path = os.path.join(cache_dir, f"{key}.images.npy")
+        self.valid_path = os.path.join(cache_dir, f"{key}.valid.npy")
+        self.index_path = os.path.join(cache_dir, f"{key}.index.joblib")
+
+        self._images = None
+        self._valid = None
+        self._prepare()
+
+    def _prepare(self) -> None:
+        """
+        Creates the cache files or invalidates the stale entries of existing ones.
+        The index is only rewritten when it changed, and is replaced atomically.
+        """
+        stats = [os.stat(path) for path in self.paths]
+        file_stats = np.array(
+            [(s.st_size, s.st_mtime_ns) for s in stats], dtype=np.int64
+        ).reshape(-1, 2)
+        index = {
+            "transform": repr(self.pre_transform),
+            "loader": repr(self.loader),
+            "paths": self.paths,
+            "sizes": file_stats[:, 0],
+            "mtimes": file_stats[:, 1],
+        }
+        previous = None
+        if all(
+            os.path.exists(p)
+            for p in (self.images_path, self.valid_path, self.index_path)
+        ):
+            previous = joblib.load(self.index_path)
+
+        if (
+            previous is None
+            or previous["transform"] != index["transform"]
+            or previous.get("loader") != index["loader"]
+            or len(previous["paths"]) != len(self.paths)
+        ):
+            shape = np.asarray(self.pre_transform(self.loader(self.paths[0]))).shape
+            np.lib.format.open_memmap(
+                self.images_path,
+                mode="w+",
+                dtype=np.uint8,
+                shape=(len(self.paths), *shape),
+            ).flush()
+            np.lib.format.open_memmap(
+                self.valid_path, mode="w+", dtype=np.uint8, shape=(len(self.paths),)
+            ).flush()
+        else:
+            stale = (
+                (
+                    np.array(previous["paths"], dtype=object)
+                    != np.array(self.paths, dtype=object)
+                )
+                | (previous["sizes"] != index["sizes"])
+                | (previous["mtimes"] != index["mtimes"])
+            )
+            if not stale.any():
+                return
+            valid = np.load(self.valid_path, mmap_mode="r+")
+            valid[stale] = 0
+            valid.flush()
+        # Written to a file of this process first, so concurrent loaders never
+        # read a partial index
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        joblib.dump(index, tmp_path)
+        os.replace(tmp_path, self.index_path)
+
+    def _open(self) -> None:
+        """Opens the memory-mapped cache files in the current process."""
+        self._images = np.load(self.images_path, mmap_mode="r+")
+        self._valid = np.load(self.valid_path, mmap_mode="r+")
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_images"] = None
+        state["_valid"] = None
+        return state
+
+    def __len__(self):
+        return len(self.paths)
+
+    def get_image(self, index: int) -> np.ndarray:
+        """
+        Returns the cached uint8 HWC image at the given dataset position, decoding
+        and storing it first if its entry is missing or stale.
+
+        Args:
+            index (int): Position of the image in the dataset.
+
+        Returns:
+            np.ndarray: The cached image.
+        """
+        if self._images is None:
+            self._open()
+        if not self._valid[index]:
+            image = self.pre_transform(self.loader(self.paths[index]))
+            self._images[index] = np.asarray(image)
+            self._valid[index] = 1
+        return self._images[index]
+
+    def __getitem__(self, index: int) -> Any:
+        """Returns the cached image at the given position with the post transform applied."""
+        return self.post_transform(self.get_image(index))
+
+    def build(self) -> None:
+        """Fills all missing or stale entries of the cache."""
+        if self._images is None:
+            self._open()
+        for index in np.flatnonzero(self._valid == 0):
+            self.get_image(index)
+        self._images.flush()
+        self._valid.flush()
@@ -0,0 +1,58 @@
+from typing import Any, BinaryIO, Tuple, Union
+from PIL import Image
+from torchvision import transforms
+
+
+def get_draft_size(transform: Any) -> Union[Tuple[int, int], None]:
+    """
+    Returns the smallest (width, height) an image can be decoded at without
+    changing the output of a transform pipeline that starts with `Resize`.
+
+    Args:
+        transform (Any): The transform pipeline.
+
+    Returns:
+        Union[Tuple[int, int], None]: The size, or None if the pipeline does not
+            start with `Resize`.
+    """
+    steps = getattr(transform, "transforms", [transform])
+    if not steps or not isinstance(steps[0], transforms.Resize):
+        return None
+    size = steps[0].size
+    if isinstance(size, int):
+        return size, size
+    if len(size) == 1:
+        return size[0], size[0]
+    return size[1], size[0]
+
+
+class ImageLoader:
+    """
+    Loads images as RGB PIL images.
+
+    With a `draft_size`, JPEGs are decoded directly at the smallest DCT scale (1/2,
+    1/4 or 1/8) whose width and height still cover the draft size, so the full
+    resolution pixels of large images are never decoded. Other formats are
+    decoded in full.
+    """
+
+    def __init__(self, draft_size: Tuple[int, int] = None):
+        """
+        Args:
+            draft_size (Tuple[int, int]): Minimum (width, height) of decoded JPEGs, e.g. from `get_draft_size`. If None, JPEGs are decoded in full.
+        """
+        self.draft_size = draft_size
+
+    def __call__(self, source: Union[str, BinaryIO]) -> Image.Image:
+        """Loads the image of a file path or file object."""
+        with Image.open(source) as image:
+            return self.convert(image)
+
+    def convert(self, image: Image.Image) -> Image.Image:
+        """Decodes an opened, not yet loaded image into RGB."""
+        if self.draft_size is not None and image.format == "JPEG":
+            image.draft("RGB", self.draft_size)
+        return image.convert("RGB")
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(draft_size={self.draft_size})"
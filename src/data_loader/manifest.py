@@ -0,0 +1,115 @@
+import os
+import hashlib
+import joblib
+from typing import Callable, Dict, List, Tuple
+
+
+class DatasetManifest:
+    """
+    Persisted index of a class-folder dataset.
+
+    The manifest stores, for every directory under the dataset root, its
+    modification time, its subdirectories and the size and modification time of
+    its files. When it is loaded again, only the directories are stat-ed: a
+    directory whose modification time is unchanged reuses its stored file entries,
+    and only directories that changed (files added, removed or renamed) are
+    re-listed. Files overwritten in place are not detected.
+    """
+
+    def __init__(self, root: str, manifest_dir: str):
+        """
+        Args:
+            root (str): Root directory of the dataset.
+            manifest_dir (str): Directory where the manifest file is stored.
+        """
+        self.root = root
+        os.makedirs(manifest_dir, exist_ok=True)
+        key = hashlib.sha1(os.path.abspath(root).encode("utf-8")).hexdigest()
+        self.manifest_path = os.path.join(manifest_dir, f"{key}.manifest.joblib")
+        self.dirs = {}
+        if os.path.exists(self.manifest_path):
+            self.dirs = joblib.load(self.manifest_path)
+        self.changed = False
+        self.dirs = self._refresh(self.dirs)
+        if self.changed:
+            self.save()
+
+    def _refresh(self, previous: Dict[str, Dict]) -> Dict[str, Dict]:
+        """Returns the directory entries of the dataset, re-listing changed directories."""
+        dirs = {}
+        pending = [""]
+        while pending:
+            rel_dir = pending.pop()
+            dir_path = os.path.join(self.root, rel_dir) if rel_dir else self.root
+            mtime = os.stat(dir_path).st_mtime_ns
+            entry = previous.get(rel_dir)
+            if entry is None or entry["mtime"] != mtime:
+                entry = {"mtime": mtime, "files": {}, "subdirs": []}
+                for item in os.scandir(dir_path):
+                    if item.is_dir():
+                        entry["subdirs"].append(item.name)
+                    elif item.is_file():
+                        stat = item.stat()
+                        entry["files"][item.name] = (stat.st_size, stat.st_mtime_ns)
+                self.changed = True
+            dirs[rel_dir] = entry
+            pending.extend(os.path.join(rel_dir, name) for name in entry["subdirs"])
+        if set(dirs) != set(previous):
+            self.changed = True
+        return dirs
+
+    def save(self) -> None:
+        """Writes the manifest file atomically."""
+        tmp_path = f"{self.manifest_path}.tmp"
+        joblib.dump(self.dirs, tmp_path)
+        os.replace(tmp_path, self.manifest_path)
+
+    def find_classes(self) -> Tuple[List[str], Dict[str, int]]:
+        """
+        Finds the class folders of the dataset, like `ImageFolder.find_classes`.
+
+        Returns:
+            Tuple[List[str], Dict[str, int]]: The class names and the class to index mapping.
+        """
+        classes = sorted(self.dirs[""]["subdirs"])
+        if not classes:
+            raise FileNotFoundError(f"Couldn't find any class folder in {self.root}.")
+        return classes, {cls_name: i for i, cls_name in enumerate(classes)}
+
+    def make_dataset(
+        self, class_to_idx: Dict[str, int], is_valid_file: Callable[[str], bool]
+    ) -> List[Tuple[str, int]]:
+        """
+        Lists the (path, class_index) samples of the dataset in the same order as
+        `ImageFolder.make_dataset`.
+
+        Args:
+            class_to_idx (Dict[str, int]): Mapping of class names to class indices.
+            is_valid_file (Callable[[str], bool]): Filter applied to every file path.
+
+        Returns:
+            List[Tuple[str, int]]: The samples of the dataset.
+        """
+        class_dirs = {}
+        for rel_dir in sorted(self.dirs):
+            if rel_dir:
+                class_dirs.setdefault(rel_dir.split(os.sep, 1)[0], []).append(rel_dir)
+
+        instances = []
+        empty_classes = []
+        for target_class in sorted(class_to_idx.keys()):
+            num_instances = len(instances)
+            for rel_dir in class_dirs.get(target_class, []):
+                dir_path = os.path.join(self.root, rel_dir)
+                for fname in sorted(self.dirs[rel_dir]["files"]):
+                    path = os.path.join(dir_path, fname)
+                    if is_valid_file(path):
+                        instances.append((path, class_to_idx[target_class]))
+            if len(instances) == num_instances:
+                empty_classes.append(target_class)
+
+        if empty_classes:
+            raise FileNotFoundError(
+                f"Found no valid file for the classes {', '.join(empty_classes)}."
+            )
+        return instances
@@ -0,0 +1,264 @@
+import io
+import os
+import copy
+import tarfile
+import joblib
+import numpy as np
+import torch
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+from torch.utils.data import IterableDataset, get_worker_info
+from torchvision.datasets.folder import IMG_EXTENSIONS, find_classes, make_dataset
+
+from data_loader.image_decoding import ImageLoader
+
+PACKED_INDEX_FILE_NAME = "packed_index.joblib"
+READ_BUFFER_SIZE = 8 << 20
+
+
+def is_packed_dataset(data_dir_path: str) -> bool:
+    """Returns whether a dataset directory holds packed shards."""
+    return os.path.isfile(os.path.join(data_dir_path, PACKED_INDEX_FILE_NAME))
+
+
+def pack_image_folder(
+    root: str,
+    output_dir: str,
+    shard_size_mb: float = 256,
+    samples: List[Tuple[str, int]] = None,
+    classes: List[str] = None,
+) -> Dict[str, Any]:
+    """
+    Packs a class-folder dataset into tar shards of about `shard_size_mb` each and
+    writes the index of the shards next to them.
+
+    Images are stored as-is (still encoded), as `<class>/<file name>` tar members,
+    in the order of the dataset, so the shards can also be inspected or unpacked
+    with `tar`. The index holds the classes, and the name, class index, shard and
+    byte range of every image.
+
+    Args:
+        root (str): Root directory of the class-folder dataset.
+        output_dir (str): Directory where the shards and the index are written.
+        shard_size_mb (float): Target size of each shard in MB.
+        samples (List[Tuple[str, int]]): Optional (path, class_index) samples, e.g.
+            from a dataset manifest. If None, the root directory is listed.
+        classes (List[str]): Class names of the samples. Required with `samples`.
+
+    Returns:
+        Dict[str, Any]: The index of the packed dataset.
+    """
+    if samples is None:
+        classes, class_to_idx = find_classes(root)
+        samples = make_dataset(root, class_to_idx, IMG_EXTENSIONS)
+    os.makedirs(output_dir, exist_ok=True)
+    shard_size = int(shard_size_mb * (1 << 20))
+
+    names, labels, shard_ids, offsets, sizes = [], [], [], [], []
+    shard_files = []
+    tar = None
+    for path, label in samples:
+        if tar is None or tar.offset >= shard_size:
+            if tar is not None:
+                tar.close()
+            shard_files.append(f"shard-{len(shard_files):06d}.tar")
+            tar = tarfile.open(os.path.join(output_dir, shard_files[-1]), "w")
+        name = Path(path).name
+        info = tar.gettarinfo(path, arcname=f"{classes[label]}/{name}")
+        with open(path, "rb") as file:
+            tar.addfile(info, file)
+        names.append(name)
+        labels.append(label)
+        shard_ids.append(len(shard_files) - 1)
+        # Member data is padded to whole blocks and ends the archive so far
+        num_blocks = -(-info.size // tarfile.BLOCKSIZE)
+        offsets.append(tar.offset - num_blocks * tarfile.BLOCKSIZE)
+        sizes.append(info.size)
+    if tar is not None:
+        tar.close()
+
+    index = {
+        "classes": list(classes),
+        "shard_files": shard_files,
+        "names": np.array(names, dtype=object),
+        "labels": np.array(labels, dtype=np.int64),
+        "shard_ids": np.array(shard_ids, dtype=np.int32),
+        "offsets": np.array(offsets, dtype=np.int64),
+        "sizes": np.array(sizes, dtype=np.int64),
+    }
+    joblib.dump(index, os.path.join(output_dir, PACKED_INDEX_FILE_NAME))
+    return index
+
+
+class PackedShardDataset(IterableDataset):
+    """
+    Dataset that streams the images of packed tar shards, written by
+    `pack_image_folder`, with sequential reads of large buffered blocks instead of
+    one file open per image. Items are (file name, image, label), as for
+    `CustomImageFolder`.
+
+    Shuffled iteration permutes the shards every epoch, splits them between the
+    loader workers and shuffles the images of each worker through an in-memory
+    buffer of `shuffle_buffer_size` encoded images. Without shuffling, worker `w`
+    of `W` reads every `W`-th batch of consecutive images, so the loader yields
+    the images in the order of the dataset.
+    """
+
+    def __init__(
+        self, root: str, transform: Callable = None, loader: ImageLoader = None
+    ):
+        """
+        Args:
+            root (str): Directory of the shards and their index.
+            transform (Callable): Transform applied to every decoded PIL image.
+            loader (ImageLoader): Decodes the images. Defaults to full decoding.
+        """
+        self.root = root
+        self.transform = transform
+        self.loader = loader or ImageLoader()
+        index = joblib.load(os.path.join(root, PACKED_INDEX_FILE_NAME))
+        self.classes = index["classes"]
+        self.class_to_idx = {name: i for i, name in enumerate(self.classes)}
+        self.shard_files = index["shard_files"]
+        self.names = index["names"]
+        self.labels = index["labels"]
+        self.shard_ids = index["shard_ids"]
+        self.offsets = index["offsets"]
+        self.sizes = index["sizes"]
+        self._set_indices(np.arange(len(self.labels)))
+        self.shuffle = False
+        self.batch_size = 1
+        self.shuffle_buffer_size = 1000
+        self.random_state = 42
+        self.epoch = 0
+
+    def _set_indices(self, indices: np.ndarray) -> None:
+        """Limits the dataset to the images at `indices` of the index."""
+        self.indices = indices
+        self.targets = self.labels[indices].tolist()
+        self.imgs = list(zip(self.names[indices], self.targets))
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    @property
+    def num_shards(self) -> int:
+        """Number of shards holding the images of the dataset."""
+        return len(np.unique(self.shard_ids[self.indices]))
+
+    def subset(self, indices: Any) -> "PackedShardDataset":
+        """
+        Returns a view of the dataset limited to the images at `indices`. The
+        images keep the order of the shards, whatever the order of `indices`, so
+        they are still read sequentially.
+        """
+        dataset = copy.copy(self)
+        dataset._set_indices(np.sort(self.indices[np.asarray(indices, dtype=np.int64)]))
+        return dataset
+
+    def for_loader(
+        self,
+        shuffle: bool,
+        batch_size: int,
+        shuffle_buffer_size: int,
+        random_state: int,
+    ) -> "PackedShardDataset":
+        """
+        Returns a view of the dataset set up for a DataLoader.
+
+        Args:
+            shuffle (bool): Whether to shuffle the images every epoch.
+            batch_size (int): Batch size of the DataLoader.
+            shuffle_buffer_size (int): Number of images in the shuffle buffer.
+            random_state (int): Seed of the shuffling.
+
+        Returns:
+            PackedShardDataset: The dataset view.
+        """
+        dataset = copy.copy(self)
+        dataset.shuffle = shuffle
+        dataset.batch_size = batch_size
+        dataset.shuffle_buffer_size = shuffle_buffer_size
+        dataset.random_state = random_state
+        return dataset
+
+    def _get_rng(self) -> np.random.Generator:
+        """
+        Returns the generator of this epoch. Every worker gets the same one, so the
+        workers agree on the shard permutation.
+        """
+        worker_info = get_worker_info()
+        if worker_info is None:
+            base_seed = torch.empty((), dtype=torch.int64).random_().item()
+        else:
+            base_seed = worker_info.seed - worker_info.id
+        # The base seed is drawn once per persistent worker, so add the epoch
+        self.epoch += 1
+        return np.random.default_rng([self.random_state, base_seed, self.epoch])
+
+    def _get_worker_indices(self, rng: np.random.Generator) -> np.ndarray:
+        """Returns the dataset indices this worker reads, in reading order."""
+        worker_info = get_worker_info()
+        worker_id, num_workers = 0, 1
+        if worker_info is not None:
+            worker_id, num_workers = worker_info.id, worker_info.num_workers
+        indices = self.indices
+        if not self.shuffle:
+            batch_numbers = np.arange(len(indices)) // self.batch_size
+            return indices[batch_numbers % num_workers == worker_id]
+
+        shard_order = rng.permutation(np.unique(self.shard_ids[indices]))
+        worker_shards = shard_order[worker_id::num_workers]
+        # Stable sort keeps the images of each shard in file order
+        rank = np.full(len(self.shard_files), len(self.shard_files))
+        rank[worker_shards] = np.arange(len(worker_shards))
+        shard_ranks = rank[self.shard_ids[indices]]
+        order = np.argsort(shard_ranks, kind="stable")
+        return indices[order[shard_ranks[order] < len(self.shard_files)]]
+
+    def _read_records(self, indices: np.ndarray) -> Iterator[Tuple[int, bytes]]:
+        """Yields the dataset index and encoded bytes of the images, in order."""
+        file, shard_id = None, None
+        try:
+            for i in indices:
+                if self.shard_ids[i] != shard_id:
+                    if file is not None:
+                        file.close()
+                    shard_id = self.shard_ids[i]
+                    file = open(
+                        os.path.join(self.root, self.shard_files[shard_id]),
+                        "rb",
+                        buffering=READ_BUFFER_SIZE,
+                    )
+                # Consecutive images are adjacent, so this seek stays in the buffer
+                file.seek(self.offsets[i])
+                yield i, file.read(self.sizes[i])
+        finally:
+            if file is not None:
+                file.close()
+
+    def _shuffle_records(
+        self, records: Iterator[Tuple[int, bytes]], rng: np.random.Generator
+    ) -> Iterator[Tuple[int, bytes]]:
+        """Shuffles a stream of records through a buffer of `shuffle_buffer_size`."""
+        buffer = []
+        for record in records:
+            if len(buffer) < self.shuffle_buffer_size:
+                buffer.append(record)
+                continue
+            j = rng.integers(len(buffer))
+            yield buffer[j]
+            buffer[j] = record
+        rng.shuffle(buffer)
+        yield from buffer
+
+    def __iter__(self) -> Iterator[Tuple[str, Any, int]]:
+        rng = self._get_rng() if self.shuffle else None
+        records = self._read_records(self._get_worker_indices(rng))
+        if self.shuffle:
+            records = self._shuffle_records(records, rng)
+        for i, data in records:
+            image = self.loader(io.BytesIO(data))
+            if self.transform is not None:
+                image = self.transform(image)
+            yield self.names[i], image, int(self.labels[i])
@@ -0,0 +1,108 @@
+import os
+import time
+import argparse
+import urllib.parse
+import urllib.request
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+from config import paths
+from logger import get_logger
+
+logger = get_logger(task_name="load_test")
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".ppm", ".bmp", ".pgm", ".tif", ".tiff")
+
+
+def read_images(data_dir_path: str) -> List[Tuple[str, bytes]]:
+    """
+    Reads the encoded image files found under a directory.
+
+    Args:
+        data_dir_path (str): The directory to search for images.
+
+    Returns:
+        List[Tuple[str, bytes]]: The file names and contents of the images.
+    """
+    images = []
+    for dir_path, _, file_names in os.walk(data_dir_path):
+        for file_name in sorted(file_names):
+            if file_name.lower().endswith(IMAGE_EXTENSIONS):
+                with open(os.path.join(dir_path, file_name), "rb") as file:
+                    images.append((file_name, file.read()))
+    if not images:
+        raise FileNotFoundError(f"No images found in {data_dir_path}.")
+    return images
+
+
+def send_request(url: str, image_id: str, image: bytes) -> float:
+    """Posts one image to the inference server and returns the request latency in seconds."""
+    query = urllib.parse.urlencode({"id": image_id})
+    request = urllib.request.Request(
+        f"{url}/infer?{query}",
+        data=image,
+        headers={"Content-Type": "application/octet-stream"},
+    )
+    start_time = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        response.read()
+    return time.perf_counter() - start_time
+
+
+def run_load_test(
+    url: str, data_dir_path: str, num_requests: int, concurrency: int
+) -> dict:
+    """
+    Sends single-image requests to the inference server from concurrent clients and
+    reports latency percentiles and throughput.
+
+    Args:
+        url (str): Base URL of the inference server.
+        data_dir_path (str): Directory of the images to send, cycled through.
+        num_requests (int): Total number of requests.
+        concurrency (int): Number of concurrent clients.
+
+    Returns:
+        dict: Latency percentiles in milliseconds and throughput in images per second.
+    """
+    images = read_images(data_dir_path)
+    # Warm up the server before measuring
+    send_request(url, *images[0])
+
+    requests = [images[i % len(images)] for i in range(num_requests)]
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(lambda args: send_request(url, *args), requests))
+    elapsed_time = time.perf_counter() - start_time
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "requests": num_requests,
+        "concurrency": concurrency,
+        "p50_latency_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_latency_ms": float(np.percentile(latencies_ms, 99)),
+        "throughput_images_per_second": num_requests / elapsed_time,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Load test a running inference server (see serve.py)."
+    )
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--data-dir", default=paths.TEST_DIR)
+    parser.add_argument("--num-requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    report = run_load_test(
+        url=args.url,
+        data_dir_path=args.data_dir,
+        num_requests=args.num_requests,
+        concurrency=args.concurrency,
+    )
+    for key, value in report.items():
+        logger.info(
+            f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}"
+        )
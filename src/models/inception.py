@@ -62,6 +62,8 @@ def get_model(
 
 
 class Inception(ImageClassifier):
+    HEAD_MODULE = "fc"
+
     def __init__(
         self,
         model_name: str,
@@ -76,13 +78,17 @@ class Inception(ImageClassifier):
         early_stopping_delta: float = 0.05,
         lr_scheduler: str = None,
         lr_scheduler_kwargs: dict = None,
+        model: torch.nn.Module = None,
         **kwargs,
     ):
         self.model_name = model_name
         self.dropout = dropout
-        self.model = get_model(
-            model_name=model_name, num_classes=num_classes, dropout=dropout
-        )
+        # A given model, e.g. with loaded weights, saves building a pretrained one
+        self.model = model
+        if self.model is None:
+            self.model = get_model(
+                model_name=model_name, num_classes=num_classes, dropout=dropout
+            )
         super().__init__(
             num_classes=num_classes,
             lr=lr,
@@ -97,6 +103,10 @@ class Inception(ImageClassifier):
             **kwargs,
         )
 
+    @property
+    def input_size(self) -> int:
+        return 299 if self.model_name == "inceptionV3" else 224
+
     @classmethod
     def load(cls, params: dict, model_state: OrderedDict) -> "Inception":
         """
@@ -119,8 +129,6 @@ class Inception(ImageClassifier):
             dropout=dropout,
         )
 
-        model.load_state_dict(model_state)
+        model.load_state_dict(model_state, assign=True)
 
-        trainer = Inception(**params)
-        trainer.model = model
-        return trainer
+        return Inception(**params, model=model)
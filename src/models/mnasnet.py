@@ -50,6 +50,8 @@ def get_model(
 
 
 class MNASNet(ImageClassifier):
+    HEAD_MODULE = "classifier"
+
     def __init__(
         self,
         model_name: str,
@@ -64,13 +66,17 @@ class MNASNet(ImageClassifier):
         early_stopping_delta: float = 0.05,
         lr_scheduler: str = None,
         lr_scheduler_kwargs: dict = None,
+        model: torch.nn.Module = None,
         **kwargs,
     ):
         self.model_name = model_name
         self.dropout = dropout
-        self.model = get_model(
-            model_name=model_name, num_classes=num_classes, dropout=dropout
-        )
+        # A given model, e.g. with loaded weights, saves building a pretrained one
+        self.model = model
+        if self.model is None:
+            self.model = get_model(
+                model_name=model_name, num_classes=num_classes, dropout=dropout
+            )
         super().__init__(
             num_classes=num_classes,
             lr=lr,
@@ -105,8 +111,6 @@ class MNASNet(ImageClassifier):
             pretrained=False,
             dropout=dropout,
         )
-        model.load_state_dict(model_state)
+        model.load_state_dict(model_state, assign=True)
 
-        trainer = MNASNet(**params)
-        trainer.model = model
-        return trainer
+        return MNASNet(**params, model=model)
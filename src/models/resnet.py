@@ -59,6 +59,8 @@ def get_model(
 
 
 class ResNet(ImageClassifier):
+    HEAD_MODULE = "fc"
+
     def __init__(
         self,
         model_name: str,
@@ -73,13 +75,17 @@ class ResNet(ImageClassifier):
         early_stopping_delta: float = 0.05,
         lr_scheduler: str = None,
         lr_scheduler_kwargs: dict = None,
+        model: torch.nn.Module = None,
         **kwargs,
     ):
         self.model_name = model_name
         self.droupout = dropout
-        self.model = get_model(
-            model_name=model_name, num_classes=num_classes, dropout=dropout
-        )
+        # A given model, e.g. with loaded weights, saves building a pretrained one
+        self.model = model
+        if self.model is None:
+            self.model = get_model(
+                model_name=model_name, num_classes=num_classes, dropout=dropout
+            )
         super().__init__(
             num_classes=num_classes,
             lr=lr,
@@ -115,8 +121,6 @@ class ResNet(ImageClassifier):
             dropout=dropout,
         )
 
-        model.load_state_dict(model_state)
+        model.load_state_dict(model_state, assign=True)
 
-        trainer = ResNet(**params)
-        trainer.model = model
-        return trainer
+        return ResNet(**params, model=model)
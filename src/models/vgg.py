@@ -56,6 +56,8 @@ def get_model(
 
 
 class VGG(ImageClassifier):
+    HEAD_MODULE = "classifier.6"
+
     def __init__(
         self,
         model_name: str,
@@ -70,13 +72,17 @@ class VGG(ImageClassifier):
         early_stopping_delta: float = 0.05,
         lr_scheduler: str = None,
         lr_scheduler_kwargs: dict = None,
+        model: torch.nn.Module = None,
         **kwargs,
     ):
         self.model_name = model_name
         self.droupout = dropout
-        self.model = get_model(
-            model_name=model_name, num_classes=num_classes, dropout=dropout
-        )
+        # A given model, e.g. with loaded weights, saves building a pretrained one
+        self.model = model
+        if self.model is None:
+            self.model = get_model(
+                model_name=model_name, num_classes=num_classes, dropout=dropout
+            )
         super().__init__(
             num_classes=num_classes,
             lr=lr,
@@ -112,8 +118,6 @@ class VGG(ImageClassifier):
             dropout=dropout,
         )
 
-        model.load_state_dict(model_state)
+        model.load_state_dict(model_state, assign=True)
 
-        trainer = VGG(**params)
-        trainer.model = model
-        return trainer
+        return VGG(**params, model=model)
@@ -0,0 +1,54 @@
+import argparse
+
+from data_loader.data_loader import CustomImageFolder
+from data_loader.packed_shards import pack_image_folder
+from logger import get_logger
+
+logger = get_logger(task_name="pack_dataset")
+
+
+def run_packing(
+    data_dir_path: str,
+    output_dir_path: str,
+    shard_size_mb: float = 256,
+    dataset_manifest_dir: str = None,
+) -> None:
+    """
+    Packs a class-folder dataset directory into tar shards with an index, which the
+    data loaders then read sequentially. Point the training, validation or testing
+    directory at the output directory to use it.
+
+    Args:
+        data_dir_path (str): Directory of the class-folder dataset.
+        output_dir_path (str): Directory where the shards and the index are written.
+        shard_size_mb (float): Target size of each shard in MB.
+        dataset_manifest_dir (str): Optional directory of dataset manifests to list the dataset with.
+    """
+    dataset = CustomImageFolder(root=data_dir_path, manifest_dir=dataset_manifest_dir)
+    logger.info(f"Packing {len(dataset.samples)} images of {data_dir_path}...")
+    index = pack_image_folder(
+        root=data_dir_path,
+        output_dir=output_dir_path,
+        shard_size_mb=shard_size_mb,
+        samples=dataset.samples,
+        classes=dataset.classes,
+    )
+    logger.info(f"Wrote {len(index['shard_files'])} shards to {output_dir_path}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pack a class-folder image dataset into tar shards."
+    )
+    parser.add_argument("data_dir")
+    parser.add_argument("output_dir")
+    parser.add_argument("--shard-size-mb", type=float, default=256)
+    parser.add_argument("--dataset-manifest-dir", default=None)
+    args = parser.parse_args()
+
+    run_packing(
+        data_dir_path=args.data_dir,
+        output_dir_path=args.output_dir,
+        shard_size_mb=args.shard_size_mb,
+        dataset_manifest_dir=args.dataset_manifest_dir,
+    )
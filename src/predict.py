@@ -1,15 +1,34 @@
+import os
 import numpy as np
-import pandas as pd
+from pathlib import Path
 
 from config import paths
 from logger import get_logger, log_error
-from prediction.predictor_model import predict_with_model, load_predictor_model
+from prediction.predictor_model import (
+    predict_with_model,
+    stream_predictions_with_model,
+    load_predictor_model,
+)
 from utils import (
-    save_dataframe_as_csv,
+    read_json_as_dict,
     ResourceTracker,
-    create_predictions_dataframe,
+    save_predictions,
+    get_predictions_file_path,
+    PredictionsWriter,
+)
+from prediction.quantization import load_quantized_predictor_model
+from prediction.sharded_prediction import stream_sharded_predictions
+from prediction.prediction_checkpoint import (
+    PredictionCheckpoint,
+    get_predictor_version,
 )
-from data_loader.data_loader import load_data_loader_factory
+from prediction.prediction_cache import (
+    PredictionCache,
+    get_model_key,
+    hash_file,
+    merge_cached_predictions,
+)
+from data_loader.data_loader import CustomImageFolder, load_data_loader_factory
 
 logger = get_logger(task_name="predict")
 
@@ -19,47 +38,212 @@ def run_batch_predictions(
     predictor_dir_path: str = paths.PREDICTOR_DIR_PATH,
     predictions_file_path: str = paths.PREDICTIONS_FILE_PATH,
     data_loader_file_path: str = paths.SAVED_DATA_LOADER_FILE_PATH,
+    model_config_file_path: str = paths.MODEL_CONFIG_FILE_PATH,
 ) -> None:
     """
-    Run batch predictions on test data, save the predicted probabilities to a CSV file.
+    Run batch predictions on test data, save the predicted probabilities to a file.
+
+    The file is written as CSV, Parquet or Arrow IPC depending on the
+    `predictions_file_format` in the model config; the extension of
+    `predictions_file_path` is replaced to match. If `stream_predictions` is
+    enabled in the model config, predictions are appended to the file batch by
+    batch instead of being collected in memory first. If `use_quantized_model` is
+    enabled, the quantized model saved by quantize.py is used. If
+    `prediction_num_shards` is greater than 1, the test data is split into that
+    many contiguous shards that are predicted by separate processes. If
+    `resume_predictions` is enabled, predictions are committed to a checkpoint in
+    chunks of `prediction_checkpoint_size` images, and a rerun after an interrupted
+    run only predicts the images that are not in the checkpoint yet. If
+    `use_prediction_cache` is enabled, images whose content was already scored with
+    the same model are not predicted again; their predictions are read from the
+    prediction cache instead.
 
     Args:
         test_dir_path (str): Directory path for the test data.
         predictor_dir_path (str): Path to the directory of saved model.
         predictions_file_path (str): Path where the predictions file will be saved.
         data_loader_file_path (str): Path to the saved data loader file.
+        model_config_file_path (str): Path to the model configuration file.
     """
 
     try:
         with ResourceTracker(logger, monitoring_interval=5):
             logger.info("Making batch predictions...")
 
+            logger.info("Loading model config...")
+            model_config = read_json_as_dict(model_config_file_path)
+            stream_predictions = model_config.get("stream_predictions", False)
+            file_format = model_config.get("predictions_file_format", "csv")
+            predictions_file_path = get_predictions_file_path(
+                predictions_file_path, file_format
+            )
+
+            use_quantized_model = model_config.get("use_quantized_model", False)
+            checkpoint = None
+            skip_image_names = None
+            if model_config.get("resume_predictions", False):
+                checkpoint = PredictionCheckpoint(
+                    checkpoint_dir=paths.PREDICTION_CHECKPOINT_DIR,
+                    chunk_size=model_config.get("prediction_checkpoint_size", 10000),
+                    run_info={
+                        "test_dir_path": os.path.abspath(test_dir_path),
+                        "predictor_version": get_predictor_version(
+                            predictor_dir_path
+                        ),
+                        "use_quantized_model": use_quantized_model,
+                    },
+                )
+                skip_image_names = checkpoint.scored_ids
+                logger.info(f"{len(skip_image_names)} images are already scored.")
+
             logger.info("Loading test data...")
             data_loader = load_data_loader_factory(
                 data_loader_file_path=data_loader_file_path
             )
+            test_dataset = data_loader.create_test_dataset(test_dir_path)
+            prediction_cache = None
+            if model_config.get("use_prediction_cache", False):
+                if not isinstance(test_dataset, CustomImageFolder):
+                    raise ValueError(
+                        "The prediction cache requires a class-folder test dataset, "
+                        "not packed shards or an archive."
+                    )
+                logger.info("Looking up cached predictions...")
+                name_to_hash = {
+                    Path(path).name: hash_file(path)
+                    for path, _ in test_dataset.imgs
+                    if not skip_image_names or Path(path).name not in skip_image_names
+                }
+                prediction_cache = PredictionCache(
+                    cache_file_path=paths.PREDICTION_CACHE_FILE_PATH,
+                    model_key=get_model_key(
+                        predictor_dir_path,
+                        data_loader.transform,
+                        use_quantized_model=use_quantized_model,
+                        image_loader=repr(data_loader.get_image_loader()),
+                    ),
+                    max_entries=model_config.get(
+                        "prediction_cache_max_entries", 1000000
+                    ),
+                )
+                found = prediction_cache.get(
+                    image_hashes=list(name_to_hash.values()),
+                    num_classes=len(data_loader.class_to_idx),
+                )
+                cached = {
+                    name: found[image_hash]
+                    for name, image_hash in name_to_hash.items()
+                    if image_hash in found
+                }
+                logger.info(f"Found {len(cached)} cached predictions.")
+                skip_image_names = set(skip_image_names or ()) | set(cached)
+
             test_data, image_names = data_loader.create_test_data_loader(
-                data_dir_path=test_dir_path
+                data_dir_path=test_dir_path,
+                skip_image_names=skip_image_names,
+                test_dataset=test_dataset,
             )
 
-            logger.info("Loading predictor model...")
-            predictor_model = load_predictor_model(predictor_dir_path)
-
-            logger.info("Making predictions...")
-            predicted_labels, predicted_probabilities = predict_with_model(
-                predictor_model, test_data
+            num_shards = model_config.get("prediction_num_shards", 1)
+            # Predictions are consumed batch by batch when they are streamed to the
+            # file or pass through the shards, the prediction cache or the checkpoint
+            batch_predictions = (
+                stream_predictions
+                or num_shards > 1
+                or checkpoint is not None
+                or prediction_cache is not None
             )
+            if num_shards > 1:
+                logger.info(f"Making predictions with {num_shards} shard processes...")
+                predictions = stream_sharded_predictions(
+                    test_dataset=test_data.dataset,
+                    num_shards=num_shards,
+                    predictor_dir_path=predictor_dir_path,
+                    data_loader_file_path=data_loader_file_path,
+                    use_quantized_model=use_quantized_model,
+                    chunk_size=(
+                        checkpoint.chunk_size if checkpoint is not None else None
+                    ),
+                )
+            else:
+                if use_quantized_model:
+                    logger.info("Loading quantized predictor model...")
+                    predictor_model = load_quantized_predictor_model(predictor_dir_path)
+                else:
+                    logger.info("Loading predictor model...")
+                    predictor_model = load_predictor_model(predictor_dir_path)
+                if batch_predictions:
+                    predictions = stream_predictions_with_model(
+                        predictor_model, test_data
+                    )
+
+            if prediction_cache is not None:
+                predictions = merge_cached_predictions(
+                    cache=prediction_cache,
+                    cached=cached,
+                    name_to_hash=name_to_hash,
+                    predictions=predictions,
+                    image_names=[Path(path).name for path, _ in test_dataset.imgs],
+                )
+
+            if checkpoint is not None:
+                logger.info(f"Making predictions for {len(image_names)} images...")
+                # Earlier chunks first, then each new chunk once it is committed
+                predictions = checkpoint.commit_predictions(predictions)
+
+            if stream_predictions:
+                logger.info("Making and saving predictions batch by batch...")
+                with PredictionsWriter(
+                    file_path=predictions_file_path,
+                    class_to_idx=data_loader.class_to_idx,
+                    file_format=file_format,
+                ) as writer:
+                    for ids, labels, probabilities in predictions:
+                        writer.write(ids=ids, probs=probabilities, predictions=labels)
+                logger.info(f"Saved {writer.num_rows} predictions.")
+
+            elif batch_predictions:
+                ids, labels, probabilities = [], [], []
+                for batch_ids, batch_labels, batch_probabilities in predictions:
+                    ids.append(np.asarray(batch_ids, dtype=object))
+                    labels.append(batch_labels)
+                    probabilities.append(batch_probabilities)
+                if ids:
+                    image_names = np.concatenate(ids)
+                    predicted_labels = np.concatenate(labels)
+                    predicted_probabilities = np.concatenate(probabilities)
+                else:
+                    # Nothing left to predict, e.g. an empty test set
+                    image_names = np.empty(0, dtype=object)
+                    predicted_labels = np.empty(0, dtype=np.int64)
+                    predicted_probabilities = np.empty(
+                        (0, len(data_loader.class_to_idx)), dtype=np.float32
+                    )
+
+            else:
+                logger.info("Making predictions...")
+                predicted_labels, predicted_probabilities = predict_with_model(
+                    predictor_model, test_data
+                )
 
-            logger.info("Creating final predictions dataframe...")
-            predictions_df = create_predictions_dataframe(
+        if not stream_predictions:
+            logger.info("Saving predictions...")
+            save_predictions(
                 ids=image_names,
                 probs=predicted_probabilities,
                 predictions=predicted_labels,
                 class_to_idx=data_loader.class_to_idx,
+                file_path=predictions_file_path,
+                file_format=file_format,
             )
 
-        logger.info("Saving predictions dataframe...")
-        save_dataframe_as_csv(dataframe=predictions_df, file_path=predictions_file_path)
+        if checkpoint is not None:
+            checkpoint.clear()
+        if prediction_cache is not None:
+            num_evicted = prediction_cache.evict()
+            if num_evicted:
+                logger.info(f"Evicted {num_evicted} predictions from the cache.")
+            prediction_cache.close()
 
     except Exception as exc:
         err_msg = "Error occurred during prediction."
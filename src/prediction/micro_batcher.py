@@ -0,0 +1,93 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List
+
+
+class MicroBatcher:
+    """
+    Groups items submitted concurrently from many threads into micro-batches that
+    are processed by a single worker thread.
+
+    The worker waits for a first item, then keeps collecting items until the batch
+    holds `max_batch_size` items or `max_latency_ms` have passed since that first
+    item arrived, whichever comes first. Each submitter gets a Future that is
+    resolved with the result for its own item.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 32,
+        max_latency_ms: float = 10.0,
+    ):
+        """
+        Args:
+            process_batch (Callable[[List[Any]], List[Any]]): Function that takes a
+                list of items and returns one result per item, in the same order.
+            max_batch_size (int): Maximum number of items in a batch.
+            max_latency_ms (float): Maximum time an item waits for the batch to fill.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self.queue = queue.Queue()
+        self.stopped = threading.Event()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, item: Any) -> Future:
+        """
+        Queue an item for the next batch.
+
+        Args:
+            item (Any): The item to process.
+
+        Returns:
+            Future: Resolved with the result for the item.
+        """
+        if self.stopped.is_set():
+            raise RuntimeError("The micro-batcher is stopped.")
+        future = Future()
+        self.queue.put((item, future))
+        return future
+
+    def _collect_batch(self) -> List:
+        """Blocks for a first item, then collects items until the batch is full or the deadline passes."""
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return [entry for entry in batch if entry is not None]
+
+    def _run(self) -> None:
+        while not self.stopped.is_set():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+            try:
+                results = self.process_batch(items)
+            except Exception as exc:
+                for future in futures:
+                    future.set_exception(exc)
+                continue
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+    def stop(self) -> None:
+        """Stops the worker thread once the batch in progress is processed."""
+        self.stopped.set()
+        # Wake up the worker if it is waiting for a first item
+        self.queue.put(None)
+        self.worker.join()
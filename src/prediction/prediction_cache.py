@@ -0,0 +1,234 @@
+import os
+import time
+import hashlib
+import sqlite3
+import numpy as np
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def hash_file(file_path: str) -> str:
+    """Returns the SHA-1 hex digest of the content of a file."""
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_model_key(predictor_dir_path: str, transform: Any, **settings: Any) -> str:
+    """
+    Returns a key for the saved model artifacts together with the image transform
+    and prediction settings. Cached predictions are only reused under the same key.
+
+    Args:
+        predictor_dir_path (str): Path to the directory of saved model.
+        transform (Any): The image transform of the data loader.
+        **settings: Other settings that change the predictions, such as
+                    whether the quantized model is used.
+
+    Returns:
+        str: The key.
+    """
+    digest = hashlib.sha1()
+    for file_name in sorted(os.listdir(predictor_dir_path)):
+        file_path = os.path.join(predictor_dir_path, file_name)
+        if os.path.isfile(file_path):
+            digest.update(file_name.encode("utf-8"))
+            digest.update(hash_file(file_path).encode("utf-8"))
+    digest.update(repr(transform).encode("utf-8"))
+    digest.update(repr(sorted(settings.items())).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """
+    On-disk cache of per-image predictions, keyed by the SHA-1 of the image file
+    content and a model key from `get_model_key`.
+
+    Entries are stored in a SQLite file, one row per image holding the predicted
+    class index and the float32 probabilities. Every hit refreshes the entry's last
+    use time; when the cache holds more than `max_entries` rows, the least recently
+    used rows are evicted.
+    """
+
+    def __init__(self, cache_file_path: str, model_key: str, max_entries: int):
+        """
+        Args:
+            cache_file_path (str): Path of the SQLite cache file.
+            model_key (str): Key of the model and transform that make the predictions.
+            max_entries (int): Maximum number of cached predictions.
+        """
+        os.makedirs(os.path.dirname(cache_file_path), exist_ok=True)
+        self.model_key = model_key
+        self.max_entries = max_entries
+        self.connection = sqlite3.connect(cache_file_path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            " image_hash TEXT NOT NULL,"
+            " model_key TEXT NOT NULL,"
+            " prediction INTEGER NOT NULL,"
+            " probabilities BLOB NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (image_hash, model_key)"
+            ") WITHOUT ROWID"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS predictions_last_used"
+            " ON predictions (last_used)"
+        )
+
+    def get(
+        self, image_hashes: Sequence[str], num_classes: int
+    ) -> Dict[str, Tuple[int, np.ndarray]]:
+        """
+        Looks up the cached predictions of images.
+
+        Args:
+            image_hashes (Sequence[str]): Content hashes of the images.
+            num_classes (int): Number of classes of the model.
+
+        Returns:
+            Dict[str, Tuple[int, np.ndarray]]: (predicted class index, probabilities)
+                of the images found in the cache, keyed by image hash.
+        """
+        found = {}
+        unique_hashes = list(set(image_hashes))
+        # Stay below SQLite's limit on the number of query parameters
+        for start in range(0, len(unique_hashes), 500):
+            chunk = unique_hashes[start : start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.connection.execute(
+                "SELECT image_hash, prediction, probabilities FROM predictions"
+                f" WHERE model_key = ? AND image_hash IN ({placeholders})",
+                [self.model_key, *chunk],
+            )
+            for image_hash, prediction, probabilities in rows:
+                probabilities = np.frombuffer(probabilities, dtype=np.float32)
+                if len(probabilities) == num_classes:
+                    found[image_hash] = (prediction, probabilities)
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "UPDATE predictions SET last_used = ?"
+                " WHERE image_hash = ? AND model_key = ?",
+                [(now, image_hash, self.model_key) for image_hash in found],
+            )
+        return found
+
+    def put(
+        self,
+        image_hashes: Sequence[str],
+        predictions: np.ndarray,
+        probabilities: np.ndarray,
+    ) -> None:
+        """
+        Stores the predictions of a batch of images.
+
+        Args:
+            image_hashes (Sequence[str]): Content hashes of the images.
+            predictions (np.ndarray): Predicted class indices of the images.
+            probabilities (np.ndarray): Class probabilities of the images.
+        """
+        now = time.time()
+        probabilities = np.asarray(probabilities, dtype=np.float32)
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)",
+                [
+                    (image_hash, self.model_key, int(prediction), row.tobytes(), now)
+                    for image_hash, prediction, row in zip(
+                        image_hashes, predictions, probabilities
+                    )
+                ],
+            )
+
+    def evict(self) -> int:
+        """
+        Removes the least recently used entries above `max_entries`.
+
+        Returns:
+            int: The number of evicted entries.
+        """
+        (num_entries,) = self.connection.execute(
+            "SELECT COUNT(*) FROM predictions"
+        ).fetchone()
+        num_evicted = max(0, num_entries - self.max_entries)
+        if num_evicted:
+            with self.connection:
+                self.connection.execute(
+                    "DELETE FROM predictions WHERE (image_hash, model_key) IN ("
+                    " SELECT image_hash, model_key FROM predictions"
+                    " ORDER BY last_used LIMIT ?)",
+                    (num_evicted,),
+                )
+            self.connection.execute("VACUUM")
+        return num_evicted
+
+    def close(self) -> None:
+        """Closes the cache file."""
+        self.connection.close()
+
+
+def stack_cached_predictions(
+    cached: Dict[str, Tuple[int, np.ndarray]], names: List[str]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns the (ids, predicted class labels, probabilities) of cached images."""
+    return (
+        np.array(names, dtype=object),
+        np.array([cached[name][0] for name in names], dtype=np.int64),
+        np.stack([cached[name][1] for name in names]),
+    )
+
+
+def merge_cached_predictions(
+    cache: PredictionCache,
+    cached: Dict[str, Tuple[int, np.ndarray]],
+    name_to_hash: Dict[str, str],
+    predictions: Iterator[Tuple[Any, np.ndarray, np.ndarray]],
+    image_names: Sequence[str],
+) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Yields the batches of new predictions, which are added to the cache as they
+    pass, with the cached predictions interleaved in the order of the test data.
+    Every batch is merged with the cached predictions of the images that come
+    before its last image.
+
+    Args:
+        cache (PredictionCache): The prediction cache.
+        cached (Dict[str, Tuple[int, np.ndarray]]): Cached (prediction, probabilities) keyed by image name.
+        name_to_hash (Dict[str, str]): Content hash of every image, keyed by image name.
+        predictions (Iterator): Batches of (ids, predicted class labels, predicted class probabilites) of the uncached images, in the order of the test data.
+        image_names (Sequence[str]): Names of all the test images, in order.
+
+    Yields:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: (ids, predicted class labels, predicted class probabilites).
+    """
+    positions = {name: i for i, name in enumerate(image_names)}
+    cached_names: List[str] = sorted(cached, key=positions.__getitem__)
+    cached_positions = np.array([positions[name] for name in cached_names])
+    start = 0
+
+    for ids, labels, probabilities in predictions:
+        cache.put(
+            image_hashes=[name_to_hash[name] for name in ids],
+            predictions=labels,
+            probabilities=probabilities,
+        )
+        stop = start
+        if len(ids):
+            stop = int(np.searchsorted(cached_positions, positions[ids[-1]]))
+        if stop > start:
+            cached_ids, cached_labels, cached_probabilities = stack_cached_predictions(
+                cached, cached_names[start:stop]
+            )
+            ids = np.concatenate([cached_ids, np.asarray(ids, dtype=object)])
+            labels = np.concatenate([cached_labels, labels])
+            probabilities = np.concatenate([cached_probabilities, probabilities])
+            order = np.argsort([positions[name] for name in ids], kind="stable")
+            ids, labels, probabilities = ids[order], labels[order], probabilities[order]
+            start = stop
+        yield ids, labels, probabilities
+    if start < len(cached_names):
+        yield stack_cached_predictions(cached, cached_names[start:])
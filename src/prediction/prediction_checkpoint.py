@@ -0,0 +1,177 @@
+import os
+import json
+import shutil
+import numpy as np
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+Chunk = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+LEDGER_FILE_NAME = "ledger.jsonl"
+CHECKPOINT_INFO_FILE_NAME = "checkpoint_info.json"
+
+
+def get_predictor_version(predictor_dir_path: str) -> float:
+    """
+    Returns the latest modification time of the files in the predictor directory,
+    so a checkpoint made with an older model is not resumed with a new one.
+    """
+    if not os.path.isdir(predictor_dir_path):
+        return 0.0
+    return max(
+        (
+            os.path.getmtime(os.path.join(predictor_dir_path, file_name))
+            for file_name in os.listdir(predictor_dir_path)
+        ),
+        default=0.0,
+    )
+
+
+class PredictionCheckpoint:
+    """
+    Commits batch predictions to disk in chunks so an interrupted prediction run
+    can be resumed. Each chunk is saved as an .npz file and then recorded, with
+    the image names it holds, as one line of an append-only ledger. A chunk only
+    counts as scored once its ledger line is written, so a crash loses at most the
+    chunk being collected.
+    """
+
+    def __init__(self, checkpoint_dir: str, chunk_size: int, run_info: Dict):
+        """
+        Args:
+            checkpoint_dir (str): Directory holding the chunks and the ledger.
+            chunk_size (int): Number of predictions collected before a chunk is committed.
+            run_info (Dict): JSON serializable description of the run (test data,
+                              model). An existing checkpoint of a different run is discarded.
+        """
+        self.checkpoint_dir = checkpoint_dir
+        self.chunk_size = chunk_size
+        self.ledger_path = os.path.join(checkpoint_dir, LEDGER_FILE_NAME)
+        info_path = os.path.join(checkpoint_dir, CHECKPOINT_INFO_FILE_NAME)
+
+        if os.path.exists(info_path):
+            with open(info_path, "r", encoding="utf-8") as file:
+                if json.load(file) != run_info:
+                    self.clear()
+        if not os.path.exists(info_path):
+            os.makedirs(checkpoint_dir, exist_ok=True)
+            with open(info_path, "w", encoding="utf-8") as file:
+                json.dump(run_info, file)
+
+        self.chunk_files, self.scored_ids = self._read_ledger()
+        self._buffer: List[Tuple[Sequence[str], np.ndarray, np.ndarray]] = []
+        self._num_buffered = 0
+
+    def _read_ledger(self) -> Tuple[List[str], Set[str]]:
+        """Returns the committed chunk files and the image names they hold."""
+        chunk_files, scored_ids = [], set()
+        if not os.path.exists(self.ledger_path):
+            return chunk_files, scored_ids
+        with open(self.ledger_path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line is cut short if the run died while writing it
+                    break
+                chunk_path = os.path.join(self.checkpoint_dir, entry["chunk"])
+                if not os.path.exists(chunk_path):
+                    break
+                chunk_files.append(entry["chunk"])
+                scored_ids.update(entry["ids"])
+        return chunk_files, scored_ids
+
+    def add(
+        self, ids: Sequence[str], predictions: np.ndarray, probabilities: np.ndarray
+    ) -> Optional[Chunk]:
+        """
+        Add one batch of predictions, committing a chunk once `chunk_size`
+        predictions are collected.
+
+        Args:
+            ids (Sequence[str]): The image names of the batch.
+            predictions (np.ndarray): Predicted class indices of the batch.
+            probabilities (np.ndarray): Class probabilities of the batch.
+
+        Returns:
+            Optional[Chunk]: (ids, predicted class labels, predicted class probabilites) of the committed chunk, or None if no chunk was committed.
+        """
+        self._buffer.append((ids, predictions, probabilities))
+        self._num_buffered += len(predictions)
+        if self._num_buffered >= self.chunk_size:
+            return self.commit()
+        return None
+
+    def commit(self) -> Optional[Chunk]:
+        """
+        Save the collected predictions as a chunk and record it in the ledger.
+
+        Returns:
+            Optional[Chunk]: (ids, predicted class labels, predicted class probabilites) of the committed chunk, or None if nothing was collected.
+        """
+        if self._num_buffered == 0:
+            return None
+        ids = np.concatenate(
+            [np.asarray(list(i), dtype=np.str_) for i, _, _ in self._buffer]
+        )
+        predictions = np.concatenate([p for _, p, _ in self._buffer])
+        probabilities = np.concatenate([p for _, _, p in self._buffer])
+
+        chunk_file = f"chunk_{len(self.chunk_files):06d}.npz"
+        chunk_path = os.path.join(self.checkpoint_dir, chunk_file)
+        tmp_path = chunk_path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            np.savez(
+                file, ids=ids, predictions=predictions, probabilities=probabilities
+            )
+        os.replace(tmp_path, chunk_path)
+
+        with open(self.ledger_path, "a", encoding="utf-8") as file:
+            file.write(json.dumps({"chunk": chunk_file, "ids": ids.tolist()}) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+        self.chunk_files.append(chunk_file)
+        self.scored_ids.update(ids.tolist())
+        self._buffer = []
+        self._num_buffered = 0
+        return ids, predictions, probabilities
+
+    def iter_chunks(self) -> Iterator[Chunk]:
+        """
+        Yields the committed chunks in the order they were committed.
+
+        Yields:
+            Chunk: (ids, predicted class labels, predicted class probabilites) of each chunk.
+        """
+        for chunk_file in list(self.chunk_files):
+            with np.load(os.path.join(self.checkpoint_dir, chunk_file)) as chunk:
+                yield chunk["ids"], chunk["predictions"], chunk["probabilities"]
+
+    def commit_predictions(
+        self, predictions: Iterable[Tuple[Sequence[str], np.ndarray, np.ndarray]]
+    ) -> Iterator[Chunk]:
+        """
+        Yields the chunks committed by an earlier run, then commits the new batch
+        predictions and yields each chunk as soon as it is committed, so the
+        predictions can be written out while the rest are still being made.
+
+        Args:
+            predictions (Iterable): (ids, predicted class labels, predicted class
+                                    probabilities) of each new batch.
+
+        Yields:
+            Chunk: (ids, predicted class labels, predicted class probabilites) of each chunk.
+        """
+        yield from self.iter_chunks()
+        for ids, labels, probabilities in predictions:
+            chunk = self.add(ids=ids, predictions=labels, probabilities=probabilities)
+            if chunk is not None:
+                yield chunk
+        chunk = self.commit()
+        if chunk is not None:
+            yield chunk
+
+    def clear(self) -> None:
+        """Remove the checkpoint directory."""
+        if os.path.exists(self.checkpoint_dir):
+            shutil.rmtree(self.checkpoint_dir)
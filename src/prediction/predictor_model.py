@@ -1,9 +1,11 @@
 import os
+import copy
+import tempfile
 import warnings
 import joblib
 import numpy as np
 import pandas as pd
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Iterator, Union
 
 import torch
 from torch.optim import Optimizer
@@ -12,6 +14,19 @@ from torch.utils.data import DataLoader
 import torch.nn.functional as F
 
 from torch_utils.early_stopping import EarlyStopping
+from torch_utils.prediction_buffer import PredictionBuffer
+from torch_utils.feature_cache import cache_features
+from torch_utils.mixed_precision import (
+    autocast,
+    get_autocast_dtype,
+    get_grad_scaler,
+)
+from torch_utils.training_checkpoint import (
+    get_rng_states,
+    set_rng_states,
+    save_training_checkpoint,
+    load_training_checkpoint,
+)
 from torch.optim.lr_scheduler import (
     ReduceLROnPlateau,
     CosineAnnealingLR,
@@ -20,6 +35,7 @@ from torch.optim.lr_scheduler import (
     _LRScheduler,
 )
 from torch_utils.lr_scheduler import WarmupCosineAnnealing
+from torch_utils.sampling import get_unsampled_data, is_weighted_sampled
 from logger import get_logger
 from tqdm import tqdm
 
@@ -28,6 +44,9 @@ warnings.filterwarnings("ignore")
 
 logger = get_logger(task_name="model")
 
+INFERENCE_GRAPH_FILE_NAME = "model_inference.pt"
+QUANTIZED_MODEL_FILE_NAME = "model_quantized.pt"
+
 # Check for GPU availability
 device = "cuda:0" if torch.cuda.is_available() else "cpu"
 logger.info(f"Using device: {device}")
@@ -79,6 +98,10 @@ class ImageClassifier:
     """
 
     MODEL_NAME = "Image_Classifier"
+    # Dotted path of the classification head inside `self.model`, set by subclasses
+    HEAD_MODULE = None
+    # Side length of the square input images expected by the model
+    input_size = 224
 
     def __init__(
         self,
@@ -91,9 +114,19 @@ class ImageClassifier:
         early_stopping: bool = False,
         early_stopping_patience: int = 10,
         early_stopping_delta: float = 0.05,
+        early_stopping_restore_best: bool = False,
+        early_stopping_spill_dir: str = None,
         lr_scheduler: str = None,
         lr_scheduler_kwargs: dict = {},
         optimizer_kwargs: dict = {},
+        train_eval_pass: str = None,
+        freeze_backbone: bool = False,
+        feature_cache_dtype: str = "float32",
+        feature_cache_dir: str = None,
+        mixed_precision: str = None,
+        compile_model: bool = False,
+        compile_mode: str = None,
+        channels_last: bool = False,
         **kwargs,
     ):
         """
@@ -104,16 +137,26 @@ class ImageClassifier:
         - lr (float): Learning rate for the optimizer. Default is 0.001.
         - optimizer (str): Name of the optimizer to use for training. Default is "adam". supported optimizers: {"adam", "sgd"}
         - max_epochs (int): Maximum number of training epochs. Default is 10.
-        - log_losses (str): Whether to log the losses. Default is "valid". supported values: {"train", "valid", "both"}. can be set to None.
+        - log_losses (str): Whether to log the losses. Default is "valid". supported values: {"train", "valid", "both"}. can be set to None. The train loss is the running average over the training pass of each epoch.
         - loss_function (str): Name of the loss function to use. Default is "cross_entropy". supported losses: {"cross_entropy", "multi_margin"}
         setting this parameter to None will disable early stopping.
         - early_stopping (bool): Whether to enable early stopping. Default is False.
         - early_stopping_patience (int): Number of epochs with no improvement after which training will be stopped. Default is 10.
         - early_stopping_delta (float): Minimum change in the monitored quantity to qualify as an improvement. Default is 0.05.
+        - early_stopping_restore_best (bool): Whether to restore the model weights and predictions of the best epoch at the end of training, whether or not early stopping triggered. Default is False.
+        - early_stopping_spill_dir (str): Directory to keep the best model weights in instead of memory, for large models. If None, they are kept in memory. Default is None.
         - lr_scheduler (str): Name of the learning rate scheduler to use. If None, no scheduler will be used. Default is None.
         supported schedulers: {"step", "exponential", "plateau", "cosine_annealing"}
         - lr_scheduler_kwargs (dict): Keyword arguments to pass to the learning rate scheduler constructor. Default is None.
         - optimizer_kwargs (dict): Keyword arguments to pass to the optimizer constructor. Default is {}.
+        - train_eval_pass (str): When to run a full eval-mode pass over the training data for the train predictions. If None, the predictions collected during the training pass of the last epoch are used, unless the training data is drawn by a weighted sampler, in which case the pass runs as for "final". Default is None. supported values: {"final", "best"}. "final" runs the pass once after training, "best" runs it once after training on the weights of the epoch with the best monitored loss. Only used when the train loss is logged.
+        - freeze_backbone (bool): Whether to train only the classification head. The backbone is run once over the train and validation data and the head is trained on the cached features. Default is False.
+        - feature_cache_dtype (str): Storage dtype of the cached features. Default is "float32". supported values: {"float32", "float16"}
+        - feature_cache_dir (str): Directory in which the temporary feature cache is created. If None, the system temporary directory is used. Default is None.
+        - mixed_precision (str): Automatic mixed precision for training and prediction. If None, everything runs in float32. Default is None. supported values: {"bfloat16", "float16"}. On CPU, autocast always uses bfloat16; on CUDA, float16 training uses a gradient scaler.
+        - compile_model (bool): Whether to run the training steps and predictions through `torch.compile`. The compiled model is reused across epochs and predict calls. Default is False.
+        - compile_mode (str): The `torch.compile` mode. If None, the default mode is used. Default is None. supported values: {"default", "reduce-overhead", "max-autotune"}
+        - channels_last (bool): Whether to run the model and its input batches in channels_last memory format, which speeds up convolutions with oneDNN on x86 CPUs. Default is False.
 
         Note:
         - The `lr_scheduler_kwargs` should contain any necessary arguments needed by the specified learning rate scheduler, excluding those arguments automatically determined by the training process, such as the optimizer.
@@ -127,8 +170,25 @@ class ImageClassifier:
         self.early_stopping = early_stopping
         self.early_stopping_delta = early_stopping_delta
         self.early_stopping_patience = early_stopping_patience
+        self.early_stopping_restore_best = early_stopping_restore_best
+        self.early_stopping_spill_dir = early_stopping_spill_dir
         self.lr_scheduler_str = lr_scheduler
         self.lr_scheduler_kwargs = lr_scheduler_kwargs
+        if train_eval_pass not in {None, "final", "best"}:
+            raise ValueError(
+                f"{train_eval_pass} is not a supported train_eval_pass. Supported: final, best"
+            )
+        self.train_eval_pass = train_eval_pass
+        self.freeze_backbone = freeze_backbone
+        self.feature_cache_dtype = feature_cache_dtype
+        self.feature_cache_dir = feature_cache_dir
+        self.device = device
+        self.mixed_precision = mixed_precision
+        self.autocast_dtype = get_autocast_dtype(mixed_precision, device)
+        self.grad_scaler = get_grad_scaler(device, self.autocast_dtype)
+        self.compile_model = compile_model
+        self.compile_mode = compile_mode
+        self.channels_last = channels_last
         self.kwargs = kwargs
 
         self.loss_function = get_loss_function(loss_function)()
@@ -144,79 +204,264 @@ class ImageClassifier:
         else:
             self.lr_scheduler = None
 
-    def forward_backward(self, data: DataLoader) -> None:
+    def get_head(self) -> torch.nn.Module:
+        """Returns the classification head of the model."""
+        if self.HEAD_MODULE is None:
+            raise ValueError(f"{type(self).__name__} does not define a head module.")
+        return self.model.get_submodule(self.HEAD_MODULE)
+
+    def set_head(self, head: torch.nn.Module) -> None:
+        """Replaces the classification head of the model."""
+        if self.HEAD_MODULE is None:
+            raise ValueError(f"{type(self).__name__} does not define a head module.")
+        parent_name, _, head_name = self.HEAD_MODULE.rpartition(".")
+        setattr(self.model.get_submodule(parent_name), head_name, head)
+
+    def to_device(self) -> None:
+        """Moves the model to the device, converting it to channels_last if enabled."""
+        if self.channels_last:
+            self.model.to(self.device, memory_format=torch.channels_last)
+        else:
+            self.model.to(self.device)
+
+    def prepare_inputs(self, inputs: torch.Tensor) -> torch.Tensor:
+        """
+        Moves a batch of inputs to the device. With `channels_last`, image batches
+        are converted to channels_last, which is a no-op for batches the data
+        loader already produced in that format. Batches in pinned memory are
+        copied to the GPU asynchronously.
+        """
+        if self.channels_last and inputs.dim() == 4:
+            return inputs.to(
+                self.device, memory_format=torch.channels_last, non_blocking=True
+            )
+        return inputs.to(self.device, non_blocking=True)
+
+    def get_forward_model(self) -> torch.nn.Module:
+        """
+        Returns the module that runs the forward passes: `self.model`, wrapped with
+        `torch.compile` if `compile_model` is set. The compiled module shares the
+        parameters of `self.model` and is cached, so its graphs are only compiled
+        once per mode (train or eval) and input shape, until `self.model` is replaced.
+        """
+        if not self.compile_model:
+            return self.model
+        if getattr(self, "_compiled_source", None) is not self.model:
+            self._compiled_model = torch.compile(self.model, mode=self.compile_mode)
+            self._compiled_source = self.model
+        return self._compiled_model
+
+    def cache_backbone_features(
+        self, train_data: DataLoader, valid_data: DataLoader = None
+    ) -> Tuple[DataLoader, Union[DataLoader, None]]:
+        """
+        Runs the backbone once over the train and validation data and caches the
+        pooled features in memory-mapped files.
+
+        Args:
+        - train_data (DataLoader): The training data.
+        - valid_data (DataLoader): The validation data.
+
+        Returns: (Tuple[DataLoader, Union[DataLoader, None]]) Data loaders over the cached train and validation features.
+        """
+        self.feature_cache = tempfile.TemporaryDirectory(dir=self.feature_cache_dir)
+        head = self.get_head()
+        self.set_head(torch.nn.Identity())
+        try:
+            logger.info("Caching backbone features for training data...")
+            train_features = cache_features(
+                model=self.model,
+                data=train_data,
+                file_path=os.path.join(self.feature_cache.name, "train.npy"),
+                dtype=self.feature_cache_dtype,
+                device=self.device,
+            )
+            valid_features = None
+            if valid_data is not None:
+                logger.info("Caching backbone features for validation data...")
+                valid_features = cache_features(
+                    model=self.model,
+                    data=valid_data,
+                    file_path=os.path.join(self.feature_cache.name, "validation.npy"),
+                    dtype=self.feature_cache_dtype,
+                    device=self.device,
+                )
+        finally:
+            self.set_head(head)
+        return train_features, valid_features
+
+    def forward_backward(
+        self, data: DataLoader, collect_predictions: bool = False
+    ) -> Dict[str, Any]:
         """
         Perform forward and backward passes on the given data.
 
+        The loss of every batch is accumulated during the pass, so the train loss can
+        be reported without a separate inference pass over the training data.
+
         Args:
         - data (DataLoader): The input data.
+        - collect_predictions (bool): Whether to also collect the ids, predicted class labels and probabilities of the training pass. Default is False.
 
-        - Returns: None
+        - Returns: (Dict[str, Any]) The running average loss of the epoch and, if collected, the predictions.
         """
         self.model.train()
         train_progress_bar = tqdm(
             total=len(data),
             desc="Epoch progress",
         )
-        for _, inputs, labels in data:
-            inputs, labels = inputs.to(device), labels.to(device)
+        model = self.get_forward_model()
+        loss_total = 0
+        num_samples = 0
+        buffer = None
+        if collect_predictions:
+            buffer = PredictionBuffer(
+                num_samples=len(data.dataset), num_classes=self.num_classes
+            )
+        for id, inputs, labels in data:
+            inputs, labels = self.prepare_inputs(inputs), labels.to(self.device)
             self.optimizer.zero_grad()
-            outputs = self.model(inputs)
-            if isinstance(outputs, tuple):
-                outputs = outputs[0]
-
-            loss = self.loss_function(outputs, labels)
-            loss.backward()
-            self.optimizer.step()
+            with autocast(self.device, self.autocast_dtype):
+                outputs = model(inputs)
+                if isinstance(outputs, tuple):
+                    outputs = outputs[0]
+
+                loss = self.loss_function(outputs, labels)
+            self.grad_scaler.scale(loss).backward()
+            self.grad_scaler.step(self.optimizer)
+            self.grad_scaler.update()
+
+            # Weigh by batch size, as the sample count of iterable datasets is not
+            # known upfront and the last batch may be smaller
+            loss_total += loss.item() * len(labels)
+            num_samples += len(labels)
+            if buffer is not None:
+                outputs = outputs.detach().float()
+                buffer.add(
+                    ids=id,
+                    predictions=torch.max(outputs, 1)[1].cpu().numpy(),
+                    probabilities=F.softmax(outputs, dim=1).cpu().numpy(),
+                )
 
             train_progress_bar.update(1)
         train_progress_bar.close()
 
+        results = buffer.results() if buffer is not None else {}
+        results["loss"] = loss_total / max(num_samples, 1)
+        return results
+
     def fit(
         self,
         train_data: DataLoader,
         valid_data: DataLoader = None,
+        checkpoint_path: str = None,
+        checkpoint_interval: int = 1,
+        checkpoint_run_info: Dict[str, Any] = None,
     ) -> Dict[str, Any]:
         """
         Fit the model to the training data.
 
+        If `checkpoint_path` is given, the training state (model, optimizer, LR
+        scheduler, early stopping, RNG states, loss history and epoch) is saved
+        there every `checkpoint_interval` epochs, and training resumes from the
+        checkpoint if one exists for the same model parameters, training options,
+        checkpoint interval and `checkpoint_run_info`.
+
         Args:
         - train_data (DataLoader): The training data.
         - valid_data (DataLoader): The validation data.
+        - checkpoint_path (str): Path of the training checkpoint file. If None, no checkpoints are saved. Default is None.
+        - checkpoint_interval (int): Number of epochs between checkpoints. Default is 1.
+        - checkpoint_run_info (Dict[str, Any]): Description of everything else the training depends on, such as a fingerprint of the training data and the data loader options. A checkpoint saved with a different one is not resumed. Default is None.
 
         Returns: (Dict[str, Any])
         """
         last_lr = self.lr
-        self.model.to(device)
-        early_stopper = EarlyStopping(
-            patience=self.early_stopping_patience,
-            delta=self.early_stopping_delta,
-        )
+        checkpoint = None
+        checkpoint_info = {
+            "params": self.get_params(),
+            "log_losses": self.log_losses,
+            "early_stopping_restore_best": self.early_stopping_restore_best,
+            "train_eval_pass": self.train_eval_pass,
+            "freeze_backbone": self.freeze_backbone,
+            "feature_cache_dtype": self.feature_cache_dtype,
+            "checkpoint_interval": checkpoint_interval,
+            "run_info": checkpoint_run_info,
+        }
+        if checkpoint_path is not None:
+            checkpoint = load_training_checkpoint(checkpoint_path)
+            if checkpoint is not None and checkpoint.get("info") != checkpoint_info:
+                logger.info("Ignoring training checkpoint of a different training run.")
+                checkpoint = None
+        if checkpoint is not None:
+            self.model.load_state_dict(checkpoint["model"])
+        self.to_device()
+        if self.freeze_backbone:
+            train_data, valid_data = self.cache_backbone_features(
+                train_data, valid_data
+            )
+            full_model = self.model
+            self.model = self.get_head()
+
         results = {}
+        best_results = {}
         loss_history = {}
         log_train_loss = self.log_losses == "train" or self.log_losses == "both"
         log_val_loss = (
             self.log_losses == "valid" or self.log_losses == "both"
         ) and valid_data is not None
+        train_eval_pass = self.train_eval_pass
+        if train_eval_pass is None and is_weighted_sampled(train_data):
+            # Sampled epochs repeat some images and skip others
+            train_eval_pass = "final"
+        restore_best = self.early_stopping and self.early_stopping_restore_best
+        eval_best = log_train_loss and train_eval_pass == "best"
+        # The early stopper also tracks the best epoch for the "best" train pass
+        early_stopper = EarlyStopping(
+            patience=self.early_stopping_patience,
+            delta=self.early_stopping_delta,
+            keep_best_state=restore_best or eval_best,
+            best_state_dir=self.early_stopping_spill_dir,
+        )
         if log_train_loss:
             loss_history["train_loss"] = []
 
         if log_val_loss:
             loss_history["validation_loss"] = []
 
-        for epoch in range(self.max_epochs):
-            self.forward_backward(train_data)
+        start_epoch = 0
+        if checkpoint is not None:
+            self.optimizer.load_state_dict(checkpoint["optimizer"])
+            if self.lr_scheduler is not None:
+                self.lr_scheduler.load_state_dict(checkpoint["lr_scheduler"])
+            early_stopper.load_state_dict(checkpoint["early_stopper"])
+            self.grad_scaler.load_state_dict(checkpoint["grad_scaler"])
+            set_rng_states(checkpoint["rng_states"])
+            loss_history = checkpoint["loss_history"]
+            results = checkpoint["results"]
+            best_results = checkpoint["best_results"]
+            last_lr = checkpoint["last_lr"]
+            start_epoch = checkpoint["epoch"]
+            logger.info(f"Resuming training from epoch {start_epoch+1}")
+            if self.early_stopping and early_stopper.early_stop:
+                start_epoch = self.max_epochs
+
+        for epoch in range(start_epoch, self.max_epochs):
+            train_p_results = self.forward_backward(
+                train_data,
+                collect_predictions=log_train_loss and train_eval_pass is None,
+            )
 
             monitored_loss = None
             if log_train_loss:
-                train_p_results = self.predict(train_data, self.loss_function)
                 train_loss = train_p_results["loss"]
                 logger.info(f"Train loss for epoch {epoch+1}: {train_loss:.3f}")
                 loss_history["train_loss"].append(train_loss)
                 monitored_loss = train_loss
-                results["train_predictions"] = train_p_results["predictions"]
-                results["train_ids"] = train_p_results["ids"]
-                results["train_probabilities"] = train_p_results["probabilities"]
+                if train_eval_pass is None:
+                    results["train_predictions"] = train_p_results["predictions"]
+                    results["train_ids"] = train_p_results["ids"]
+                    results["train_probabilities"] = train_p_results["probabilities"]
 
             if log_val_loss:
                 val_p_results = self.predict(valid_data, self.loss_function)
@@ -235,14 +480,144 @@ class ImageClassifier:
                     logger.info(f"Learning rate set to {scheduler_lr}")
                     last_lr = scheduler_lr
 
-            if self.early_stopping and monitored_loss is not None:
-                if early_stopper(monitored_loss):
-                    logger.info(f"Early stopping after {epoch+1} epochs")
-                    break
+            stop = False
+            if monitored_loss is not None and (self.early_stopping or eval_best):
+                stop = early_stopper(monitored_loss, self.model) and self.early_stopping
+                if early_stopper.improved:
+                    best_results = dict(results)
+
+            if checkpoint_path is not None and (
+                stop
+                or (epoch + 1) % checkpoint_interval == 0
+                or epoch + 1 == self.max_epochs
+            ):
+                model = full_model if self.freeze_backbone else self.model
+                save_training_checkpoint(
+                    checkpoint_path,
+                    {
+                        "info": checkpoint_info,
+                        "epoch": epoch + 1,
+                        "model": model.state_dict(),
+                        "optimizer": self.optimizer.state_dict(),
+                        "lr_scheduler": (
+                            self.lr_scheduler.state_dict()
+                            if self.lr_scheduler is not None
+                            else None
+                        ),
+                        "early_stopper": early_stopper.state_dict(),
+                        "grad_scaler": self.grad_scaler.state_dict(),
+                        "rng_states": get_rng_states(),
+                        "loss_history": loss_history,
+                        "results": results,
+                        "best_results": best_results,
+                        "last_lr": last_lr,
+                    },
+                )
+
+            if stop:
+                logger.info(f"Early stopping after {epoch+1} epochs")
+                break
+
+        restored = False
+        if restore_best:
+            restored = early_stopper.restore_best_state(self.model)
+            if restored:
+                logger.info("Restored the model weights of the best epoch")
+                results.update(best_results)
+
+        if eval_best:
+            final_state = None
+            if not restored:
+                # Only the train pass runs on the weights of the best epoch
+                final_state = {
+                    k: v.detach().to("cpu", copy=True)
+                    for k, v in self.model.state_dict().items()
+                }
+                early_stopper.restore_best_state(self.model)
+            self.predict_train_data(train_data, results)
+            if final_state is not None:
+                self.model.load_state_dict(final_state)
+        elif log_train_loss and train_eval_pass == "final":
+            self.predict_train_data(train_data, results)
+        early_stopper.cleanup()
+
+        if self.freeze_backbone:
+            self.model = full_model
+            self.feature_cache.cleanup()
 
         results["loss_history"] = pd.DataFrame(loss_history)
         return results
 
+    def predict_train_data(self, train_data: DataLoader, results: Dict) -> None:
+        """
+        Run a full eval-mode pass over the training data and store its predictions
+        in the fit results. Training data drawn by a weighted sampler is read once
+        in order instead, so every image is predicted exactly once.
+
+        Args:
+        - train_data (DataLoader): The training data.
+        - results (Dict): The fit results to update.
+        """
+        logger.info("Predicting on training data...")
+        train_p_results = self.predict(get_unsampled_data(train_data))
+        results["train_predictions"] = train_p_results["predictions"]
+        results["train_ids"] = train_p_results["ids"]
+        results["train_probabilities"] = train_p_results["probabilities"]
+
+    def predict_batches(
+        self, data: DataLoader, loss_function=None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Predicts the class labels and probabilities for the given data, one batch at a time.
+
+        Args:
+            - data (DataLoader): The input data.
+            - loss_function (Callable): The loss function to use for calculating the batch loss. Default is None.
+
+        Yields:
+            Dict[str, Any]: A dictionary containing the ids, predicted class labels, probabilities and optionally the loss of one batch.
+        """
+        self.model.eval()
+        self.to_device()
+        model = self.get_forward_model()
+        with torch.no_grad(), autocast(self.device, self.autocast_dtype):
+            for id, inputs, labels in data:
+                inputs, labels = self.prepare_inputs(inputs), labels.to(self.device)
+                outputs = model(inputs).float()
+                probs = F.softmax(outputs, dim=1)
+                _, predicted = torch.max(outputs.data, 1)
+                batch_results = {
+                    "ids": id,
+                    "predictions": predicted.cpu().numpy(),
+                    "probabilities": probs.cpu().numpy(),
+                }
+                if loss_function is not None:
+                    loss = loss_function(outputs, labels)
+                    batch_results["loss"] = loss.item()
+                yield batch_results
+
+    def predict_inputs(self, inputs: torch.Tensor) -> Dict[str, np.ndarray]:
+        """
+        Predicts the class labels and probabilities for a batch of preprocessed inputs.
+
+        Args:
+            - inputs (torch.Tensor): The normalized input images.
+
+        Returns:
+            Dict[str, np.ndarray]: A dictionary containing the predicted class labels and probabilities.
+        """
+        self.model.eval()
+        self.to_device()
+        model = self.get_forward_model()
+        with torch.no_grad(), autocast(self.device, self.autocast_dtype):
+            outputs = model(self.prepare_inputs(inputs)).float()
+            probs = F.softmax(outputs, dim=1)
+            _, predicted = torch.max(outputs, 1)
+        return {
+            "predictions": predicted.cpu().numpy(),
+            "probabilities": probs.cpu().numpy(),
+        }
+
     def predict(self, data: DataLoader, loss_function=None) -> Dict:
         """
         Predicts the class labels and probabilities for the given data.
@@ -254,39 +629,25 @@ class ImageClassifier:
         Returns:
             Dict: A dictionary containing the predicted class labels, probabilities and optionally the loss.
         """
-        self.model.eval()
-        self.model.to(device)
         loss_total = 0
-        with torch.no_grad():
-            all_labels, all_predicted, all_probs, ids = (
-                np.array([]),
-                np.array([]),
-                np.array([]),
-                np.array([]),
+        num_samples = 0
+        buffer = PredictionBuffer(
+            num_samples=len(data.dataset), num_classes=self.num_classes
+        )
+        for batch_results in self.predict_batches(data, loss_function):
+            buffer.add(
+                ids=batch_results["ids"],
+                predictions=batch_results["predictions"],
+                probabilities=batch_results["probabilities"],
             )
+            if loss_function is not None:
+                batch_size = len(batch_results["predictions"])
+                loss_total += batch_results["loss"] * batch_size
+                num_samples += batch_size
 
-            for id, inputs, labels in data:
-                inputs, labels = inputs.to(device), labels.to(device)
-                outputs = self.model(inputs)
-                probs = F.softmax(outputs, dim=1)
-                _, predicted = torch.max(outputs.data, 1)
-
-                # Convert tensors to numpy arrays before appending
-                all_predicted = np.append(all_predicted, predicted.cpu().numpy())
-                all_labels = np.append(all_labels, labels.cpu().numpy())
-                all_probs = (
-                    np.concatenate((all_probs, probs.cpu().numpy()), axis=0)
-                    if all_probs.size
-                    else probs.cpu().numpy()
-                )
-                ids = np.append(ids, id)
-                if loss_function is not None:
-                    loss = loss_function(outputs, labels)
-                    loss_total += loss.item()
-
-        results = {"predictions": all_predicted, "probabilities": all_probs, "ids": ids}
+        results = buffer.results()
         if loss_function is not None:
-            results["loss"] = loss_total / len(data)
+            results["loss"] = loss_total / max(num_samples, 1)
 
         return results
 
@@ -303,7 +664,14 @@ class ImageClassifier:
         - predictor_path (str): The directory path where the model parameters
           and state are to be saved.
         """
-        model_params = {
+        params_path = os.path.join(predictor_dir_path, "model_params.joblib")
+        model_path = os.path.join(predictor_dir_path, "model_state.pth")
+        joblib.dump(self.get_params(), params_path)
+        torch.save(self.model.state_dict(), model_path)
+
+    def get_params(self) -> Dict[str, Any]:
+        """Returns the parameters the model is saved and reconstructed with."""
+        return {
             "model_name": self.model_name,
             "lr": self.lr,
             "optimizer": self.optimizer_str,
@@ -314,19 +682,26 @@ class ImageClassifier:
             "early_stopping_patience": self.early_stopping_patience,
             "early_stopping_delta": self.early_stopping_delta,
             "num_classes": self.num_classes,
+            "mixed_precision": self.mixed_precision,
+            "compile_model": self.compile_model,
+            "compile_mode": self.compile_mode,
+            "channels_last": self.channels_last,
         }
-        params_path = os.path.join(predictor_dir_path, "model_params.joblib")
-        model_path = os.path.join(predictor_dir_path, "model_state.pth")
-        joblib.dump(model_params, params_path)
-        torch.save(self.model.state_dict(), model_path)
 
     @classmethod
-    def load(cls, predictor_dir_path: str) -> "ImageClassifier":
+    def load(cls, predictor_dir_path: str, mmap: bool = False) -> "ImageClassifier":
         """
         Loads a pretrained model and its training configuration from a specified path.
 
+        The loaded state tensors are assigned to the model instead of being copied
+        into it, so with `mmap` the weights stay memory-mapped from the state file
+        and are shared through the page cache by every process that loads it. This
+        does not hold for models with `channels_last`, whose weights are copied when
+        they are converted to that memory format.
+
         Args:
         - predictor_dir_path (str): Path to the directory with model's parameters and state.
+        - mmap (bool): Whether to memory-map the model state instead of reading it into memory.
 
         Returns:
         - ResNet: A trainer object with the loaded model and training configuration.
@@ -334,7 +709,10 @@ class ImageClassifier:
         params_path = os.path.join(predictor_dir_path, "model_params.joblib")
         model_path = os.path.join(predictor_dir_path, "model_state.pth")
         params = joblib.load(params_path)
-        model_state = torch.load(model_path)
+        if mmap:
+            model_state = torch.load(model_path, mmap=True, map_location="cpu")
+        else:
+            model_state = torch.load(model_path)
         model_name = params["model_name"]
 
         if model_name.startswith("resnet"):
@@ -357,6 +735,59 @@ class ImageClassifier:
 
             return VGG.load(params, model_state)
 
+    def save_inference_graph(self, predictor_dir_path: str) -> None:
+        """
+        Saves a frozen TorchScript graph of the model for inference.
+
+        The model is traced in eval mode with its auxiliary heads removed, then
+        frozen, which folds BatchNorm into the preceding convolutions and drops
+        dropout layers.
+
+        Args:
+        - predictor_dir_path (str): The directory path where the graph is to be saved.
+        """
+        model = copy.deepcopy(self.model).cpu().eval()
+        for aux_head in ("AuxLogits", "aux1", "aux2"):
+            if getattr(model, aux_head, None) is not None:
+                setattr(model, aux_head, None)
+        if hasattr(model, "aux_logits"):
+            model.aux_logits = False
+
+        example_inputs = torch.zeros(1, 3, self.input_size, self.input_size)
+        with torch.no_grad():
+            graph = torch.jit.freeze(torch.jit.trace(model, example_inputs))
+        torch.jit.save(
+            graph, os.path.join(predictor_dir_path, INFERENCE_GRAPH_FILE_NAME)
+        )
+
+    @classmethod
+    def load_inference_graph(cls, predictor_dir_path: str) -> "ImageClassifier":
+        """
+        Loads the frozen inference graph saved by `save_inference_graph` without
+        constructing the model architecture. The returned classifier can only be
+        used for prediction.
+
+        Args:
+        - predictor_dir_path (str): Path to the directory with model's parameters and graph.
+
+        Returns:
+        - ImageClassifier: A classifier running the frozen graph.
+        """
+        params = joblib.load(os.path.join(predictor_dir_path, "model_params.joblib"))
+        trainer = cls.__new__(cls)
+        trainer.model_name = params["model_name"]
+        trainer.num_classes = params["num_classes"]
+        trainer.device = device
+        # The frozen graph runs in the dtypes and memory format it was traced with
+        trainer.autocast_dtype = None
+        trainer.channels_last = False
+        trainer.compile_model = False
+        trainer.model = torch.jit.load(
+            os.path.join(predictor_dir_path, INFERENCE_GRAPH_FILE_NAME),
+            map_location=device,
+        )
+        return trainer
+
     def evaluate(self, test_data: DataLoader):
         """Evaluate the model and return the loss"""
         return self.predict(data_loader=test_data, loss_function=self.loss_function)[
@@ -368,12 +799,49 @@ class ImageClassifier:
         return f"Model name: {self.MODEL_NAME}"
 
 
+def get_classifier_class(model_name: str) -> type:
+    """
+    Returns the ImageClassifier subclass that implements a model.
+
+    Args:
+        model_name (str): The name of the model.
+
+    Returns:
+        type: The ImageClassifier subclass.
+    """
+    if model_name.startswith("resnet"):
+        from models.resnet import ResNet
+
+        return ResNet
+
+    if model_name.startswith("inception"):
+        from models.inception import Inception
+
+        return Inception
+
+    if model_name.startswith("mnasnet"):
+        from models.mnasnet import MNASNet
+
+        return MNASNet
+
+    if model_name.startswith("vgg"):
+        from models.vgg import VGG
+
+        return VGG
+
+    raise ValueError(f"Invalid model name: {model_name}")
+
+
 def train_predictor_model(
     model_name: str,
     train_data: DataLoader,
     hyperparameters: dict,
     num_classes: int,
     valid_data: DataLoader = None,
+    checkpoint_path: str = None,
+    checkpoint_interval: int = 1,
+    checkpoint_run_info: Dict = None,
+    model: ImageClassifier = None,
 ) -> Tuple[ImageClassifier, Dict]:
     """
     Instantiate and train the classifier model.
@@ -384,39 +852,27 @@ def train_predictor_model(
         hyperparameters (dict): Hyperparameters for the model.
         num_classes (int): Number of classes in the classificatiion problem.
         valid_data (DataLoader): The validation data.
+        checkpoint_path (str): Path of the training checkpoint to save and resume from.
+        checkpoint_interval (int): Number of epochs between training checkpoints.
+        checkpoint_run_info (Dict): Training data and options a checkpoint must match to be resumed.
+        model (ImageClassifier): Already instantiated model to train, e.g. the one the data loader was tuned with. If None, a new model is instantiated.
 
     Returns:
         'ImageClassifier': The ImageClassifier model
     """
-
-    if model_name.startswith("resnet"):
-        from models.resnet import ResNet
-
-        constructor = ResNet
-
-    elif model_name.startswith("inception"):
-        from models.inception import Inception
-
-        constructor = Inception
-
-    elif model_name.startswith("mnasnet"):
-        from models.mnasnet import MNASNet
-
-        constructor = MNASNet
-
-    elif model_name.startswith("vgg"):
-        from models.vgg import VGG
-
-        constructor = VGG
-
-    model = constructor(
-        model_name=model_name,
-        num_classes=num_classes,
-        **hyperparameters,
-    )
+    if model is None:
+        constructor = get_classifier_class(model_name)
+        model = constructor(
+            model_name=model_name,
+            num_classes=num_classes,
+            **hyperparameters,
+        )
     train_info = model.fit(
         train_data=train_data,
         valid_data=valid_data,
+        checkpoint_path=checkpoint_path,
+        checkpoint_interval=checkpoint_interval,
+        checkpoint_run_info=checkpoint_run_info,
     )
     return model, train_info
 
@@ -438,31 +894,70 @@ def predict_with_model(
     return results["predictions"], results["probabilities"]
 
 
-def save_predictor_model(model: ImageClassifier, predictor_dir_path: str) -> None:
+def stream_predictions_with_model(
+    model: ImageClassifier, test_data: DataLoader
+) -> Iterator[Tuple[Any, np.ndarray, np.ndarray]]:
+    """
+    Make predictions one batch at a time.
+
+    Args:
+        model (ImageClassifier): The ImageClassifier model.
+        test_data (DataLoader): The test input data for model.
+
+    Yields:
+        Tuple[Any, np.ndarray, np.ndarray]: (batch ids, predicted class labels, predicted class probabilites).
+    """
+    for batch_results in model.predict_batches(test_data):
+        yield (
+            batch_results["ids"],
+            batch_results["predictions"],
+            batch_results["probabilities"],
+        )
+
+
+def save_predictor_model(
+    model: ImageClassifier, predictor_dir_path: str, save_inference_graph: bool = False
+) -> None:
     """
     Save the ImageClassifier model to disk.
 
+    Artifacts derived from a previously saved model (inference graph, quantized
+    model) are removed so they are never loaded with the new model.
+
     Args:
         model (ImageClassifier): The Classifier model to save.
         predictor_dir_path (str): Dir path to which to save the model.
+        save_inference_graph (bool): Whether to also save a frozen inference graph of the model.
     """
     if not os.path.exists(predictor_dir_path):
         os.makedirs(predictor_dir_path)
+    for file_name in (INFERENCE_GRAPH_FILE_NAME, QUANTIZED_MODEL_FILE_NAME):
+        file_path = os.path.join(predictor_dir_path, file_name)
+        if os.path.exists(file_path):
+            os.remove(file_path)
     model.save(predictor_dir_path)
+    if save_inference_graph:
+        model.save_inference_graph(predictor_dir_path)
 
 
-def load_predictor_model(predictor_dir_path: str) -> ImageClassifier:
+def load_predictor_model(
+    predictor_dir_path: str, prefer_inference_graph: bool = True, mmap: bool = False
+) -> ImageClassifier:
     """
     Load the ImageClassifier model from disk.
 
     Args:
         predictor_dir_path (str): Dir path where model is saved.
+        prefer_inference_graph (bool): Whether to load the frozen inference graph when one was saved.
+        mmap (bool): Whether to memory-map the model state. Has no effect when the inference graph is loaded, which is always read into memory, or for models with `channels_last`, whose weights are copied on conversion.
 
     Returns:
         ImageClassifier: A new instance of the loaded ImageClassifier model.
     """
-
-    return ImageClassifier.load(predictor_dir_path)
+    graph_path = os.path.join(predictor_dir_path, INFERENCE_GRAPH_FILE_NAME)
+    if prefer_inference_graph and os.path.exists(graph_path):
+        return ImageClassifier.load_inference_graph(predictor_dir_path)
+    return ImageClassifier.load(predictor_dir_path, mmap=mmap)
 
 
 def evaluate_predictor_model(model: ImageClassifier, test_data: DataLoader) -> float:
@@ -0,0 +1,153 @@
+import os
+import copy
+import torch
+from typing import Tuple
+from torch.ao.quantization import get_default_qconfig_mapping, quantize_dynamic
+from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+from torch.utils.data import DataLoader
+
+from prediction.predictor_model import (
+    ImageClassifier,
+    load_predictor_model,
+    QUANTIZED_MODEL_FILE_NAME,
+)
+
+SUPPORTED_QUANTIZATION_METHODS = {"dynamic", "static"}
+
+
+def get_quantization_engine() -> str:
+    """Returns the best quantized engine supported by this build of PyTorch."""
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in torch.backends.quantized.supported_engines:
+            return engine
+    raise RuntimeError("No quantized engine is supported on this machine.")
+
+
+def quantize_dynamic_model(model: torch.nn.Module) -> torch.nn.Module:
+    """
+    Applies dynamic int8 quantization to the Linear layers of a model. Weights are
+    quantized ahead of time and activations on the fly, so no calibration is needed.
+
+    Args:
+        model (torch.nn.Module): The float model.
+
+    Returns:
+        torch.nn.Module: A quantized copy of the model.
+    """
+    model = copy.deepcopy(model).cpu().eval()
+    return quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_static_model(
+    model: torch.nn.Module,
+    calibration_data: DataLoader,
+    num_calibration_batches: int = 10,
+) -> torch.nn.Module:
+    """
+    Applies static int8 post-training quantization to the whole model, convolutions
+    included, using FX graph mode. Activation ranges are calibrated on batches of
+    the given data.
+
+    Args:
+        model (torch.nn.Module): The float model.
+        calibration_data (DataLoader): Data to draw calibration batches from.
+        num_calibration_batches (int): Number of batches used for calibration.
+
+    Returns:
+        torch.nn.Module: A quantized copy of the model.
+    """
+    torch.backends.quantized.engine = get_quantization_engine()
+    model = copy.deepcopy(model).cpu().eval()
+    qconfig_mapping = get_default_qconfig_mapping(torch.backends.quantized.engine)
+    _, example_inputs, _ = next(iter(calibration_data))
+    prepared = prepare_fx(model, qconfig_mapping, example_inputs=(example_inputs,))
+    with torch.no_grad():
+        for i, (_, inputs, _) in enumerate(calibration_data):
+            if i >= num_calibration_batches:
+                break
+            prepared(inputs)
+    return convert_fx(prepared)
+
+
+def quantize_predictor_model(
+    model: ImageClassifier,
+    method: str,
+    calibration_data: DataLoader,
+    num_calibration_batches: int = 10,
+) -> Tuple[ImageClassifier, torch.jit.ScriptModule]:
+    """
+    Quantize the ImageClassifier model for CPU inference.
+
+    Args:
+        model (ImageClassifier): The trained float model.
+        method (str): "dynamic" to quantize the Linear heads only, or "static" to
+            also quantize the convolutional backbone with calibration.
+        calibration_data (DataLoader): Data used for calibration and tracing.
+        num_calibration_batches (int): Number of batches used for static calibration.
+
+    Returns:
+        Tuple[ImageClassifier, torch.jit.ScriptModule]: A copy of the classifier that
+        runs the quantized model on CPU, and the traced quantized module.
+    """
+    if method not in SUPPORTED_QUANTIZATION_METHODS:
+        raise ValueError(
+            f"{method} is not a supported quantization method. "
+            f"Supported: {SUPPORTED_QUANTIZATION_METHODS}"
+        )
+    torch.backends.quantized.engine = get_quantization_engine()
+    if method == "dynamic":
+        quantized = quantize_dynamic_model(model.model)
+    else:
+        quantized = quantize_static_model(
+            model.model, calibration_data, num_calibration_batches
+        )
+
+    _, example_inputs, _ = next(iter(calibration_data))
+    with torch.no_grad():
+        traced = torch.jit.freeze(torch.jit.trace(quantized, example_inputs[:1]).eval())
+
+    quantized_model = copy.copy(model)
+    quantized_model.model = traced
+    quantized_model.device = "cpu"
+    quantized_model.autocast_dtype = None
+    quantized_model.compile_model = False
+    return quantized_model, traced
+
+
+def save_quantized_model(
+    traced_model: torch.jit.ScriptModule, predictor_dir_path: str
+) -> None:
+    """
+    Save the traced quantized model next to the float model state.
+
+    Args:
+        traced_model (torch.jit.ScriptModule): The traced quantized model.
+        predictor_dir_path (str): Dir path of the saved predictor model.
+    """
+    torch.jit.save(
+        traced_model, os.path.join(predictor_dir_path, QUANTIZED_MODEL_FILE_NAME)
+    )
+
+
+def load_quantized_predictor_model(predictor_dir_path: str) -> ImageClassifier:
+    """
+    Load the ImageClassifier model with its quantized model from disk.
+
+    Args:
+        predictor_dir_path (str): Dir path where the model is saved.
+
+    Returns:
+        ImageClassifier: The loaded model, running the quantized model on CPU.
+    """
+    quantized_model_path = os.path.join(predictor_dir_path, QUANTIZED_MODEL_FILE_NAME)
+    if not os.path.exists(quantized_model_path):
+        raise FileNotFoundError(
+            f"No quantized model found at {quantized_model_path}. Run quantize.py first."
+        )
+    torch.backends.quantized.engine = get_quantization_engine()
+    model = load_predictor_model(predictor_dir_path)
+    model.model = torch.jit.load(quantized_model_path, map_location="cpu")
+    model.device = "cpu"
+    model.autocast_dtype = None
+    model.compile_model = False
+    return model
@@ -0,0 +1,127 @@
+import os
+import multiprocessing
+import numpy as np
+import torch
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, Tuple
+from torch.utils.data import Dataset
+
+from prediction.predictor_model import load_predictor_model
+from prediction.quantization import load_quantized_predictor_model
+from data_loader.data_loader import load_data_loader_factory, subset_dataset
+
+# State of a shard process, set up once by `init_shard_process`
+_shard_state: Dict[str, Any] = {}
+
+
+def get_threads_per_shard(num_shards: int) -> int:
+    """Returns the number of torch threads each shard gets so the shards share the CPU cores evenly."""
+    return max(1, (os.cpu_count() or 1) // num_shards)
+
+
+def init_shard_process(
+    test_dataset: Dataset,
+    num_shards: int,
+    predictor_dir_path: str,
+    data_loader_file_path: str,
+    use_quantized_model: bool = False,
+) -> None:
+    """
+    Sets up a shard process: limits its threads and loads the data loader factory
+    and the model once, for all the index ranges the process predicts.
+
+    Args:
+        test_dataset (Dataset): The test dataset, as built by the main process.
+        num_shards (int): Number of shard processes.
+        predictor_dir_path (str): Path to the directory of saved model.
+        data_loader_file_path (str): Path to the saved data loader file.
+        use_quantized_model (bool): Whether to use the quantized model.
+    """
+    torch.set_num_threads(get_threads_per_shard(num_shards))
+    data_loader = load_data_loader_factory(data_loader_file_path)
+    # The loader workers of all shards share the cores too, but a shard keeps at
+    # least one worker so decoding stays off its predicting process
+    if data_loader.num_workers > 0:
+        data_loader.num_workers = max(1, data_loader.num_workers // num_shards)
+    if use_quantized_model:
+        model = load_quantized_predictor_model(predictor_dir_path)
+    else:
+        model = load_predictor_model(predictor_dir_path, mmap=True)
+    _shard_state.update(test_dataset=test_dataset, data_loader=data_loader, model=model)
+
+
+def predict_shard(start: int, stop: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Make predictions on a contiguous range of the test dataset. Runs in a shard
+    process set up by `init_shard_process`.
+
+    Args:
+        start (int): Index of the first image of the range.
+        stop (int): Index after the last image of the range.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: (ids, predicted class labels, predicted class probabilites) of the range.
+    """
+    test_dataset = subset_dataset(_shard_state["test_dataset"], range(start, stop))
+    test_data = _shard_state["data_loader"].create_data_loader(
+        test_dataset, shuffle=False
+    )
+    results = _shard_state["model"].predict(test_data)
+    return results["ids"], results["predictions"], results["probabilities"]
+
+
+def stream_sharded_predictions(
+    test_dataset: Dataset,
+    num_shards: int,
+    predictor_dir_path: str,
+    data_loader_file_path: str,
+    use_quantized_model: bool = False,
+    chunk_size: int = None,
+) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Make predictions with one process per contiguous shard of the test data. Each
+    process receives the test dataset built by the main process, so the test data
+    directory is not listed again, loads the model once, with memory-mapped
+    weights, and runs with its share of the CPU threads. Shard results are yielded
+    in shard order, which is the original order of the test data.
+
+    With a `chunk_size`, the test data is split into contiguous chunks of that many
+    images instead, which the processes predict in turn. The results of every
+    chunk are yielded as soon as the chunks before it are done, so a prediction
+    checkpoint fed with them makes progress during the run.
+
+    Args:
+        test_dataset (Dataset): The test dataset, without the images to skip.
+        num_shards (int): Number of shards and processes.
+        predictor_dir_path (str): Path to the directory of saved model.
+        data_loader_file_path (str): Path to the saved data loader file.
+        use_quantized_model (bool): Whether to use the quantized model.
+        chunk_size (int): Optional number of images per task. If None, every process predicts one shard.
+
+    Yields:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: (ids, predicted class labels, predicted class probabilites) of each shard or chunk.
+    """
+    if chunk_size is None:
+        bounds = np.linspace(0, len(test_dataset), num_shards + 1).astype(int)
+    else:
+        bounds = np.append(
+            np.arange(0, len(test_dataset), chunk_size), len(test_dataset)
+        )
+    with ProcessPoolExecutor(
+        max_workers=num_shards,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_shard_process,
+        initargs=(
+            test_dataset,
+            num_shards,
+            predictor_dir_path,
+            data_loader_file_path,
+            use_quantized_model,
+        ),
+    ) as executor:
+        futures = [
+            executor.submit(predict_shard, int(start), int(stop))
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+        for future in futures:
+            yield future.result()
@@ -0,0 +1,167 @@
+import os
+import time
+import numpy as np
+from config import paths
+from logger import get_logger, log_error
+from prediction.predictor_model import ImageClassifier, load_predictor_model
+from prediction.quantization import quantize_predictor_model, save_quantized_model
+from data_loader.data_loader import load_data_loader_factory
+from data_loader.archive_dataset import is_archive_dataset
+from data_loader.packed_shards import is_packed_dataset
+from torch.utils.data import DataLoader
+from utils import read_json_as_dict, contains_subdirectories, save_json, ResourceTracker
+
+logger = get_logger(task_name="quantize")
+
+VALIDATION_EXISTS = (
+    os.path.isdir(paths.VALIDATION_DIR)
+    and (
+        contains_subdirectories(paths.VALIDATION_DIR)
+        or is_packed_dataset(paths.VALIDATION_DIR)
+    )
+) or is_archive_dataset(paths.VALIDATION_DIR)
+
+
+def evaluate_accuracy(
+    model: ImageClassifier, data: DataLoader, truth_labels: dict, idx_to_class: dict
+) -> dict:
+    """
+    Computes the accuracy and prediction time of a model on labelled data.
+
+    Args:
+        model (ImageClassifier): The model to evaluate.
+        data (DataLoader): The data to evaluate on.
+        truth_labels (dict): Mapping of image names to their true class labels.
+        idx_to_class (dict): Mapping of class indices to class labels.
+
+    Returns:
+        dict: The accuracy and the prediction time in seconds.
+    """
+    start_time = time.time()
+    results = model.predict(data)
+    elapsed_time = time.time() - start_time
+    predicted = np.array([idx_to_class[i] for i in results["predictions"]])
+    truth = np.array([truth_labels[i] for i in results["ids"]])
+    return {
+        "accuracy": float((predicted == truth).mean()),
+        "prediction_time_seconds": elapsed_time,
+    }
+
+
+def run_quantization(
+    model_config_file_path: str = paths.MODEL_CONFIG_FILE_PATH,
+    train_dir_path: str = paths.TRAIN_DIR,
+    valid_dir_path: str = paths.VALIDATION_DIR,
+    predictor_dir_path: str = paths.PREDICTOR_DIR_PATH,
+    data_loader_file_path: str = paths.SAVED_DATA_LOADER_FILE_PATH,
+    quantization_report_file_path: str = paths.QUANTIZATION_REPORT_FILE_PATH,
+) -> None:
+    """
+    Quantize the trained model for CPU inference, save the quantized model next to
+    the float model and report the accuracy change on the validation split.
+
+    Args:
+        model_config_file_path (str, optional): The path of the model configuration file.
+        train_dir_path (str, optional): The directory path of the train data.
+        valid_dir_path (str, optional): The directory path of the validation data.
+        predictor_dir_path (str, optional): The directory path of the saved predictor model.
+        data_loader_file_path (str, optional): Path to the saved data loader file.
+        quantization_report_file_path (str, optional): The file path to where the quantization report be saved.
+    Returns:
+        None
+    """
+    try:
+        with ResourceTracker(logger=logger, monitoring_interval=5):
+            logger.info("Starting quantization...")
+
+            logger.info("Loading model config...")
+            model_config = read_json_as_dict(model_config_file_path)
+            method = model_config.get("quantization_method", "dynamic")
+            num_calibration_batches = model_config.get(
+                "quantization_calibration_batches", 10
+            )
+
+            logger.info("Loading data...")
+            data_loader_factory = load_data_loader_factory(data_loader_file_path)
+            train_data, valid_data = (
+                data_loader_factory.create_train_and_valid_data_loaders(
+                    train_dir_path=train_dir_path,
+                    validation_dir_path=valid_dir_path if VALIDATION_EXISTS else None,
+                )
+            )
+
+            logger.info("Loading predictor model...")
+            model = load_predictor_model(
+                predictor_dir_path, prefer_inference_graph=False
+            )
+
+            logger.info(f"Quantizing model ({method})...")
+            quantized_model, traced_model = quantize_predictor_model(
+                model=model,
+                method=method,
+                calibration_data=train_data,
+                num_calibration_batches=num_calibration_batches,
+            )
+
+            if valid_data is not None:
+                evaluation_split = "validation"
+                evaluation_data = valid_data
+                truth_labels = dict(
+                    zip(
+                        data_loader_factory.val_image_names,
+                        data_loader_factory.val_image_labels,
+                    )
+                )
+            else:
+                evaluation_split = "train"
+                evaluation_data = train_data
+                truth_labels = dict(
+                    zip(
+                        data_loader_factory.train_image_names,
+                        data_loader_factory.train_image_labels,
+                    )
+                )
+            idx_to_class = {v: k for k, v in data_loader_factory.class_to_idx.items()}
+
+            logger.info(
+                f"Evaluating float and quantized models on {evaluation_split} data..."
+            )
+            float_metrics = evaluate_accuracy(
+                model, evaluation_data, truth_labels, idx_to_class
+            )
+            quantized_metrics = evaluate_accuracy(
+                quantized_model, evaluation_data, truth_labels, idx_to_class
+            )
+
+        logger.info("Saving quantized model...")
+        save_quantized_model(traced_model, predictor_dir_path)
+
+        report = {
+            "method": method,
+            "evaluation_split": evaluation_split,
+            "float": float_metrics,
+            "quantized": quantized_metrics,
+            "accuracy_change": quantized_metrics["accuracy"]
+            - float_metrics["accuracy"],
+        }
+        logger.info(
+            f"Accuracy on {evaluation_split} data: float {float_metrics['accuracy']:.4f}, "
+            f"quantized {quantized_metrics['accuracy']:.4f}"
+        )
+        logger.info("Saving quantization report...")
+        save_json(quantization_report_file_path, report)
+
+    except Exception as exc:
+        err_msg = "Error occurred during quantization."
+        # Log the error
+        logger.error(f"{err_msg} Error: {str(exc)}")
+        # Log the error to the separate logging file
+        log_error(
+            message=err_msg, error=exc, error_fpath=paths.QUANTIZE_ERROR_FILE_PATH
+        )
+        # re-raise the error
+        raise Exception(f"{err_msg} Error: {str(exc)}") from exc
+
+
+if __name__ == "__main__":
+    run_quantization()
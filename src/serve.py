@@ -0,0 +1,233 @@
+import io
+import json
+import base64
+import numpy as np
+import torch
+from typing import List, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from PIL import Image
+
+from config import paths
+from logger import get_logger, log_error
+from prediction.predictor_model import ImageClassifier, load_predictor_model
+from prediction.micro_batcher import MicroBatcher
+from prediction.quantization import load_quantized_predictor_model
+from data_loader.data_loader import (
+    PyTorchDataLoaderFactory,
+    load_data_loader_factory,
+)
+from utils import read_json_as_dict, create_predictions_dataframe
+
+logger = get_logger(task_name="serve")
+
+
+class InferenceService:
+    """
+    Runs the predictor model on micro-batches of images submitted by concurrent
+    requests. Images are decoded and transformed in the request threads; the
+    batched normalization and forward pass run on the micro-batcher's worker.
+    """
+
+    def __init__(
+        self,
+        model: ImageClassifier,
+        data_loader: PyTorchDataLoaderFactory,
+        max_batch_size: int = 32,
+        max_latency_ms: float = 10.0,
+    ):
+        """
+        Args:
+            model (ImageClassifier): The loaded predictor model.
+            data_loader (PyTorchDataLoaderFactory): The saved data loader factory,
+                used for the image transforms and the class labels.
+            max_batch_size (int): Maximum number of images in a micro-batch.
+            max_latency_ms (float): Maximum time an image waits for its batch to fill.
+        """
+        self.model = model
+        self.data_loader = data_loader
+        self.batcher = MicroBatcher(
+            process_batch=self.predict_batch,
+            max_batch_size=max_batch_size,
+            max_latency_ms=max_latency_ms,
+        )
+
+    def predict_batch(
+        self, images: List[torch.Tensor]
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Predicts a micro-batch of transformed images, one (prediction, probabilities) per image."""
+        inputs = self.data_loader.normalize(torch.stack(images))
+        results = self.model.predict_inputs(inputs)
+        return list(zip(results["predictions"], results["probabilities"]))
+
+    def decode_images(self, images: List[bytes]) -> List[torch.Tensor]:
+        """
+        Decodes and transforms encoded images.
+
+        Args:
+            images (List[bytes]): The encoded image files.
+
+        Returns:
+            List[torch.Tensor]: The transformed uint8 CHW images.
+
+        Raises:
+            ValueError: If there are no images or an image can not be decoded.
+        """
+        if not images:
+            raise ValueError("The request contains no images.")
+        decoded = []
+        for i, image in enumerate(images):
+            try:
+                decoded.append(
+                    self.data_loader.transform_image(Image.open(io.BytesIO(image)))
+                )
+            except Exception as exc:
+                raise ValueError(f"Image {i} can not be decoded: {exc}") from exc
+        return decoded
+
+    def predict(self, ids: List[str], images: List[torch.Tensor]) -> List[dict]:
+        """
+        Predicts the class probabilities of decoded images.
+
+        Args:
+            ids (List[str]): The identifiers of the images.
+            images (List[torch.Tensor]): The images returned by `decode_images`.
+
+        Returns:
+            List[dict]: One record per image, with the same fields as the rows of
+            the predictions file.
+        """
+        futures = [self.batcher.submit(image) for image in images]
+        results = [future.result() for future in futures]
+        predictions_df = create_predictions_dataframe(
+            ids=ids,
+            probs=np.stack([probs for _, probs in results]),
+            predictions=np.array([prediction for prediction, _ in results]),
+            class_to_idx=self.data_loader.class_to_idx,
+        )
+        return json.loads(predictions_df.to_json(orient="records"))
+
+
+class InferenceRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP API of the inference service.
+
+    - GET /ping: health check.
+    - POST /infer: with a JSON body `{"instances": [{"id": ..., "image": <base64>}]}`,
+      or with the raw bytes of a single image and an optional `id` query parameter.
+    """
+
+    service: InferenceService = None
+
+    def send_json(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def read_instances(self) -> Tuple[List[str], List[bytes]]:
+        """Reads the image ids and encoded images from the request."""
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            instances = json.loads(body)["instances"]
+            ids = [str(instance["id"]) for instance in instances]
+            images = [base64.b64decode(instance["image"]) for instance in instances]
+            return ids, images
+        query = parse_qs(urlparse(self.path).query)
+        return [query.get("id", ["image"])[0]], [body]
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/ping":
+            self.send_json(200, {"status": "ok"})
+        else:
+            self.send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/infer":
+            self.send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        try:
+            ids, images = self.read_instances()
+            images = self.service.decode_images(images)
+        except Exception as exc:
+            self.send_json(400, {"error": f"Invalid request. Error: {str(exc)}"})
+            return
+        try:
+            predictions = self.service.predict(ids, images)
+        except Exception as exc:
+            logger.error(f"Error occurred during inference. Error: {str(exc)}")
+            self.send_json(500, {"error": f"Inference failed. Error: {str(exc)}"})
+            return
+        self.send_json(200, {"predictions": predictions})
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def run_server(
+    predictor_dir_path: str = paths.PREDICTOR_DIR_PATH,
+    data_loader_file_path: str = paths.SAVED_DATA_LOADER_FILE_PATH,
+    model_config_file_path: str = paths.MODEL_CONFIG_FILE_PATH,
+) -> None:
+    """
+    Load the predictor model once and serve predictions over HTTP.
+
+    Concurrent requests are grouped into micro-batches of up to
+    `serve_max_batch_size` images, waiting at most `serve_max_latency_ms` for a
+    batch to fill. The server listens on `serve_host`:`serve_port` from the model
+    config. If `use_quantized_model` is enabled, the quantized model is served.
+
+    Args:
+        predictor_dir_path (str): Path to the directory of saved model.
+        data_loader_file_path (str): Path to the saved data loader file.
+        model_config_file_path (str): Path to the model configuration file.
+    """
+    try:
+        logger.info("Loading model config...")
+        model_config = read_json_as_dict(model_config_file_path)
+
+        logger.info("Loading data loader...")
+        data_loader = load_data_loader_factory(
+            data_loader_file_path=data_loader_file_path
+        )
+
+        if model_config.get("use_quantized_model", False):
+            logger.info("Loading quantized predictor model...")
+            predictor_model = load_quantized_predictor_model(predictor_dir_path)
+        else:
+            logger.info("Loading predictor model...")
+            predictor_model = load_predictor_model(predictor_dir_path)
+
+        InferenceRequestHandler.service = InferenceService(
+            model=predictor_model,
+            data_loader=data_loader,
+            max_batch_size=model_config.get("serve_max_batch_size", 32),
+            max_latency_ms=model_config.get("serve_max_latency_ms", 10.0),
+        )
+        host = model_config.get("serve_host", "0.0.0.0")
+        port = model_config.get("serve_port", 8080)
+        server = ThreadingHTTPServer((host, port), InferenceRequestHandler)
+
+    except Exception as exc:
+        err_msg = "Error occurred while starting the inference server."
+        # Log the error
+        logger.error(f"{err_msg} Error: {str(exc)}")
+        # Log the error to the separate logging file
+        log_error(message=err_msg, error=exc, error_fpath=paths.SERVE_ERROR_FILE_PATH)
+        # re-raise the error
+        raise Exception(f"{err_msg} Error: {str(exc)}") from exc
+
+    logger.info(f"Serving predictions on {host}:{port}...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        InferenceRequestHandler.service.batcher.stop()
+
+
+if __name__ == "__main__":
+    run_server()
@@ -1,21 +1,38 @@
+import os
+import tempfile
+import torch
+from typing import Dict, Union
+
+
 class EarlyStopping:
     """Early stops the training if loss doesn't improve after a given patience."""
 
-    def __init__(self, patience=7, delta=0):
+    def __init__(
+        self, patience=7, delta=0, keep_best_state=False, best_state_dir=None
+    ):
         """
         Args:
             patience (int): How long to wait after last time validation loss improved.
                             Default: 7
             delta (float): Minimum change in the monitored quantity to qualify as an improvement.
                             Default: 0
+            keep_best_state (bool): Whether to keep a copy of the model state of the best epoch, to be restored with `restore_best_state`.
+                            Default: False
+            best_state_dir (str): Directory to spill the best model state to instead of keeping it in memory, for large models.
+                            Default: None
         """
         self.patience = patience
         self.counter = 0
         self.best_score = None
         self.early_stop = False
         self.delta = delta
+        self.improved = False
+        self.keep_best_state = keep_best_state
+        self.best_state_dir = best_state_dir
+        self.best_state = None
+        self.best_state_file = None
 
-    def __call__(self, loss: float) -> bool:
+    def __call__(self, loss: float, model: torch.nn.Module = None) -> bool:
         """
         Call method to evaluate the early stopping condition.
 
@@ -23,6 +40,7 @@ class EarlyStopping:
 
         Parameters:
         - loss (float): The current epoch's loss value.
+        - model (torch.nn.Module): The model being trained. If `keep_best_state` is set, its state is copied whenever the loss improves.
 
         Returns:
         - bool: True if early stopping is triggered (i.e., the training should stop); False otherwise.
@@ -36,8 +54,10 @@ class EarlyStopping:
         """
         score = -loss
 
+        self.improved = False
         if self.best_score is None:
             self.best_score = score
+            self.improved = True
         elif score < self.best_score + self.delta:
             self.counter += 1
             if self.counter >= self.patience:
@@ -45,5 +65,83 @@ class EarlyStopping:
         else:
             self.best_score = score
             self.counter = 0
+            self.improved = True
+
+        if self.improved and self.keep_best_state and model is not None:
+            state = model.state_dict()
+            self._store_best_state(
+                {k: v.detach().to("cpu", copy=True) for k, v in state.items()}
+            )
 
         return self.early_stop
+
+    def _store_best_state(self, state: Dict[str, torch.Tensor]) -> None:
+        """Keeps the best model state in memory or spills it to `best_state_dir`."""
+        if self.best_state_dir is None:
+            self.best_state = state
+            return
+        if self.best_state_file is None:
+            os.makedirs(self.best_state_dir, exist_ok=True)
+            fd, self.best_state_file = tempfile.mkstemp(
+                suffix=".pth", dir=self.best_state_dir
+            )
+            os.close(fd)
+        torch.save(state, self.best_state_file)
+
+    def get_best_state(self) -> Union[Dict[str, torch.Tensor], None]:
+        """Returns the model state of the best epoch, or None if none was kept."""
+        if self.best_state_file is not None:
+            return torch.load(self.best_state_file)
+        return self.best_state
+
+    def restore_best_state(self, model: torch.nn.Module) -> bool:
+        """
+        Loads the model state of the best epoch into the model.
+
+        Parameters:
+        - model (torch.nn.Module): The model to restore.
+
+        Returns:
+        - bool: True if a best state was kept and restored; False otherwise.
+        """
+        state = self.get_best_state()
+        if state is None:
+            return False
+        model.load_state_dict(state)
+        return True
+
+    def cleanup(self) -> None:
+        """Releases the kept best model state and removes its spill file."""
+        self.best_state = None
+        if self.best_state_file is not None:
+            os.remove(self.best_state_file)
+            self.best_state_file = None
+
+    def state_dict(self) -> dict:
+        """
+        Returns the state of the early stopper, for training checkpoints. A best
+        state kept in memory is part of it; a spilled one is referenced by the path
+        of its spill file, so it is not loaded back into memory or copied into
+        every checkpoint.
+        """
+        return {
+            "counter": self.counter,
+            "best_score": self.best_score,
+            "early_stop": self.early_stop,
+            "best_state": self.best_state,
+            "best_state_file": self.best_state_file,
+        }
+
+    def load_state_dict(self, state_dict: dict) -> None:
+        """
+        Restores a state returned by `state_dict`. A spilled best state is reused
+        from its spill file if the file still exists.
+        """
+        self.counter = state_dict["counter"]
+        self.best_score = state_dict["best_score"]
+        self.early_stop = state_dict["early_stop"]
+        best_state_file = state_dict.get("best_state_file")
+        if best_state_file is not None and os.path.exists(best_state_file):
+            self.best_state_file = best_state_file
+        elif state_dict.get("best_state") is not None:
+            self._store_best_state(state_dict["best_state"])
@@ -0,0 +1,96 @@
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset, RandomSampler, WeightedRandomSampler
+
+from torch_utils.sampling import get_unsampled_data
+
+
+class CachedFeatureDataset(Dataset):
+    """
+    Dataset over backbone features cached in a memory-mapped array. Items have the
+    same (id, input, label) layout as the image datasets, with the pooled feature
+    vector as the input.
+    """
+
+    def __init__(self, ids: np.ndarray, features: np.ndarray, labels: np.ndarray):
+        self.ids = ids
+        self.features = features
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, index):
+        feature = np.asarray(self.features[index], dtype=np.float32)
+        return self.ids[index], torch.from_numpy(feature), int(self.labels[index])
+
+
+def cache_features(
+    model: torch.nn.Module,
+    data: DataLoader,
+    file_path: str,
+    dtype: str = "float32",
+    device: str = "cpu",
+) -> DataLoader:
+    """
+    Runs the model once over the data and stores its flattened outputs in a
+    memory-mapped .npy file.
+
+    Args:
+        model (torch.nn.Module): The backbone, i.e. the model with its head replaced by an identity.
+        data (DataLoader): The image data to extract features from.
+        file_path (str): Path of the .npy file to write the features to.
+        dtype (str): Storage dtype of the features, "float32" or "float16". Default is "float32".
+        device (str): Device to run the backbone on. Default is "cpu".
+
+    Returns:
+        DataLoader: A data loader over the cached features with the batch size and
+        shuffling, or weighted sampler, of the given data loader.
+    """
+    if dtype not in {"float32", "float16"}:
+        raise ValueError(
+            f"Invalid feature cache dtype: {dtype}. Supported: float32, float16"
+        )
+    sampler = data.sampler if isinstance(data.sampler, WeightedRandomSampler) else None
+    # Packed shard datasets shuffle themselves rather than through a sampler
+    shuffle = sampler is None and (
+        isinstance(data.sampler, RandomSampler)
+        or getattr(data.dataset, "shuffle", False)
+    )
+    # Cache every sample once, in dataset order, so the sampler weights line up
+    data = get_unsampled_data(data)
+    num_samples = len(data.dataset)
+    ids = np.empty(num_samples, dtype=object)
+    labels = np.empty(num_samples, dtype=np.int64)
+    features = None
+    size = 0
+
+    model.eval()
+    with torch.no_grad():
+        for batch_ids, inputs, batch_labels in data:
+            outputs = torch.flatten(model(inputs.to(device)), 1)
+            if features is None:
+                features = np.lib.format.open_memmap(
+                    file_path,
+                    mode="w+",
+                    dtype=dtype,
+                    shape=(num_samples, outputs.shape[1]),
+                )
+            end = size + len(outputs)
+            features[size:end] = outputs.cpu().numpy()
+            ids[size:end] = list(batch_ids)
+            labels[size:end] = batch_labels.numpy()
+            size = end
+
+    if features is None:
+        features = np.empty((0, 0), dtype=dtype)
+    else:
+        features.flush()
+
+    dataset = CachedFeatureDataset(ids[:size], features[:size], labels[:size])
+    return DataLoader(
+        dataset,
+        batch_size=data.batch_size,
+        shuffle=shuffle,
+        sampler=sampler,
+    )
@@ -0,0 +1,69 @@
+import torch
+from typing import Union
+
+SUPPORTED_MIXED_PRECISIONS = {"bfloat16", "float16"}
+
+
+def get_autocast_dtype(mixed_precision: str, device: str) -> Union[torch.dtype, None]:
+    """
+    Returns the autocast dtype for a mixed precision setting on a device.
+
+    CPU autocast always runs in bfloat16, which is accelerated by AVX512-BF16 and
+    AMX. On CUDA, both bfloat16 and float16 are used as given.
+
+    Args:
+        mixed_precision (str): "bfloat16", "float16" or None for full float32.
+        device (str): The device the model runs on.
+
+    Returns:
+        Union[torch.dtype, None]: The autocast dtype, or None if autocast is disabled.
+    """
+    if mixed_precision is None:
+        return None
+    if mixed_precision not in SUPPORTED_MIXED_PRECISIONS:
+        raise ValueError(
+            f"{mixed_precision} is not a supported mixed precision. "
+            f"Supported: {SUPPORTED_MIXED_PRECISIONS}"
+        )
+    if get_device_type(device) == "cpu":
+        return torch.bfloat16
+    return getattr(torch, mixed_precision)
+
+
+def get_device_type(device: str) -> str:
+    """Returns the device type ("cpu" or "cuda") of a device string."""
+    return torch.device(device).type
+
+
+def autocast(device: str, dtype: Union[torch.dtype, None]) -> torch.autocast:
+    """
+    Returns an autocast context for the device, disabled when `dtype` is None.
+
+    Args:
+        device (str): The device the model runs on.
+        dtype (Union[torch.dtype, None]): The autocast dtype from `get_autocast_dtype`.
+
+    Returns:
+        torch.autocast: The autocast context manager.
+    """
+    return torch.autocast(
+        device_type=get_device_type(device),
+        dtype=dtype,
+        enabled=dtype is not None,
+    )
+
+
+def get_grad_scaler(device: str, dtype: Union[torch.dtype, None]):
+    """
+    Returns a gradient scaler for float16 training on CUDA. For any other setting
+    the scaler is disabled and passes the loss and optimizer step through.
+
+    Args:
+        device (str): The device the model runs on.
+        dtype (Union[torch.dtype, None]): The autocast dtype from `get_autocast_dtype`.
+
+    Returns:
+        torch.cuda.amp.GradScaler: The gradient scaler.
+    """
+    enabled = dtype == torch.float16 and get_device_type(device) == "cuda"
+    return torch.cuda.amp.GradScaler(enabled=enabled)
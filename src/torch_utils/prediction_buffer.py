@@ -0,0 +1,61 @@
+import numpy as np
+from typing import Dict, Sequence
+
+
+class PredictionBuffer:
+    """
+    Collects batched prediction results into buffers preallocated for the whole
+    dataset, so each batch is written into a slice instead of re-copying the
+    accumulated arrays.
+    """
+
+    def __init__(self, num_samples: int, num_classes: int):
+        """
+        Args:
+            num_samples (int): Upper bound on the number of samples to collect,
+                                usually `len(data_loader.dataset)`.
+            num_classes (int): Number of columns in the probabilities buffer.
+        """
+        self.ids = np.empty(num_samples, dtype=object)
+        self.predictions = np.empty(num_samples, dtype=np.int64)
+        self.probabilities = np.empty((num_samples, num_classes), dtype=np.float32)
+        self.size = 0
+
+    def add(
+        self,
+        ids: Sequence[str],
+        predictions: np.ndarray,
+        probabilities: np.ndarray,
+    ) -> None:
+        """
+        Write one batch of results into the next free slice of the buffers.
+
+        Args:
+            ids (Sequence[str]): The sample identifiers of the batch.
+            predictions (np.ndarray): Predicted class indices of the batch.
+            probabilities (np.ndarray): Class probabilities of the batch.
+        """
+        start = self.size
+        end = start + len(predictions)
+        if end > len(self.predictions):
+            raise ValueError(
+                f"Prediction buffer overflow: capacity is {len(self.predictions)},"
+                f" got {end} samples."
+            )
+        self.ids[start:end] = list(ids)
+        self.predictions[start:end] = predictions
+        self.probabilities[start:end] = probabilities
+        self.size = end
+
+    def results(self) -> Dict[str, np.ndarray]:
+        """
+        Returns views over the filled part of the buffers.
+
+        Returns:
+            Dict[str, np.ndarray]: The collected ids, predictions and probabilities.
+        """
+        return {
+            "predictions": self.predictions[: self.size],
+            "probabilities": self.probabilities[: self.size],
+            "ids": self.ids[: self.size],
+        }
@@ -0,0 +1,88 @@
+import numpy as np
+import torch
+from typing import Sequence
+from torch.utils.data import DataLoader, WeightedRandomSampler
+
+SUPPORTED_SAMPLINGS = {"balanced", "sqrt_balanced"}
+
+
+def get_class_sampling_weights(
+    class_counts: np.ndarray,
+    sampling: str = None,
+    class_weights: Sequence[float] = None,
+) -> np.ndarray:
+    """
+    Returns the weight each sample of a class is drawn with.
+
+    "balanced" weighs the samples of a class by the inverse of the class size, so
+    every class is drawn equally often. "sqrt_balanced" weighs them by the inverse
+    square root of the class size, which draws classes in proportion to the
+    square root of their size. Explicit class weights multiply these weights.
+
+    Args:
+        class_counts (np.ndarray): Number of training samples of every class.
+        sampling (str): "balanced", "sqrt_balanced" or None for no rebalancing.
+        class_weights (Sequence[float]): Optional relative weight of every class.
+
+    Returns:
+        np.ndarray: The per-sample weight of every class.
+    """
+    weights = np.ones(len(class_counts), dtype=np.float64)
+    if sampling is not None:
+        if sampling not in SUPPORTED_SAMPLINGS:
+            raise ValueError(
+                f"{sampling} is not a supported sampling. "
+                f"Supported: {SUPPORTED_SAMPLINGS}"
+            )
+        counts = np.maximum(np.asarray(class_counts, dtype=np.float64), 1)
+        weights = 1 / counts if sampling == "balanced" else 1 / np.sqrt(counts)
+    if class_weights is not None:
+        weights = weights * np.asarray(class_weights, dtype=np.float64)
+    return weights
+
+
+def create_weighted_sampler(
+    targets: np.ndarray, class_sampling_weights: np.ndarray
+) -> WeightedRandomSampler:
+    """
+    Creates a sampler that draws as many samples per epoch as there are targets,
+    with replacement, each with the sampling weight of its class.
+
+    Args:
+        targets (np.ndarray): Class index of every sample.
+        class_sampling_weights (np.ndarray): Per-sample weight of every class, from `get_class_sampling_weights`.
+
+    Returns:
+        WeightedRandomSampler: The sampler.
+    """
+    weights = torch.from_numpy(class_sampling_weights[np.asarray(targets)])
+    return WeightedRandomSampler(weights, num_samples=len(weights), replacement=True)
+
+
+def is_weighted_sampled(data: DataLoader) -> bool:
+    """Returns whether a data loader draws its samples with a weighted sampler."""
+    return isinstance(data.sampler, WeightedRandomSampler)
+
+
+def get_unsampled_data(data: DataLoader) -> DataLoader:
+    """
+    Returns a data loader that reads every sample of `data` once, in order. For
+    loaders that draw their samples with a `WeightedRandomSampler`, this is a new
+    loader over the same dataset; other loaders are returned as they are.
+
+    Args:
+        data (DataLoader): The data loader.
+
+    Returns:
+        DataLoader: The data loader that reads every sample once.
+    """
+    if not is_weighted_sampled(data):
+        return data
+    if hasattr(data, "sequential"):
+        return data.sequential()
+    return DataLoader(
+        data.dataset,
+        batch_size=data.batch_size,
+        num_workers=data.num_workers,
+        collate_fn=data.collate_fn,
+    )
@@ -0,0 +1,63 @@
+import os
+import random
+import numpy as np
+import torch
+from typing import Any, Dict, Union
+
+
+def get_rng_states() -> Dict[str, Any]:
+    """Returns the states of the Python, NumPy and PyTorch random number generators."""
+    states = {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "torch": torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        states["cuda"] = torch.cuda.get_rng_state_all()
+    return states
+
+
+def set_rng_states(states: Dict[str, Any]) -> None:
+    """Restores random number generator states returned by `get_rng_states`."""
+    random.setstate(states["python"])
+    np.random.set_state(states["numpy"])
+    torch.set_rng_state(states["torch"])
+    if "cuda" in states and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(states["cuda"])
+
+
+def save_training_checkpoint(file_path: str, checkpoint: Dict[str, Any]) -> None:
+    """
+    Saves a training checkpoint atomically: the checkpoint is written to a
+    temporary file that then replaces the previous checkpoint, so a crash while
+    saving never leaves a partial checkpoint behind.
+
+    Args:
+        file_path (str): Path of the checkpoint file.
+        checkpoint (Dict[str, Any]): The training state to save.
+    """
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tmp_path = f"{file_path}.tmp"
+    torch.save(checkpoint, tmp_path)
+    os.replace(tmp_path, file_path)
+
+
+def load_training_checkpoint(file_path: str) -> Union[Dict[str, Any], None]:
+    """
+    Loads a training checkpoint saved by `save_training_checkpoint`.
+
+    Args:
+        file_path (str): Path of the checkpoint file.
+
+    Returns:
+        Union[Dict[str, Any], None]: The training state, or None if there is no checkpoint.
+    """
+    if not os.path.exists(file_path):
+        return None
+    return torch.load(file_path, map_location="cpu", weights_only=False)
+
+
+def remove_training_checkpoint(file_path: str) -> None:
+    """Removes the checkpoint file, if there is one."""
+    if os.path.exists(file_path):
+        os.remove(file_path)
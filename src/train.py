@@ -1,22 +1,36 @@
 import os
 from config import paths
 from logger import get_logger, log_error
-from prediction.predictor_model import save_predictor_model, train_predictor_model
-from data_loader.data_loader import get_data_loader
+from prediction.predictor_model import (
+    get_classifier_class,
+    save_predictor_model,
+    train_predictor_model,
+)
+from data_loader.data_loader import get_data_loader, get_dataset_fingerprint
+from data_loader.autotune import autotune_data_loader_factory
+from data_loader.archive_dataset import is_archive_dataset
+from data_loader.packed_shards import is_packed_dataset
+from torch_utils.training_checkpoint import remove_training_checkpoint
 from utils import (
     read_json_as_dict,
     set_seeds,
     contains_subdirectories,
     save_dataframe_as_csv,
     ResourceTracker,
+    save_predictions,
+    get_predictions_file_path,
+    save_json,
 )
-from utils import create_predictions_dataframe
 
 logger = get_logger(task_name="train")
 
-VALIDATION_EXISTS = os.path.isdir(paths.VALIDATION_DIR) and contains_subdirectories(
-    paths.VALIDATION_DIR
-)
+VALIDATION_EXISTS = (
+    os.path.isdir(paths.VALIDATION_DIR)
+    and (
+        contains_subdirectories(paths.VALIDATION_DIR)
+        or is_packed_dataset(paths.VALIDATION_DIR)
+    )
+) or is_archive_dataset(paths.VALIDATION_DIR)
 
 
 def run_training(
@@ -30,10 +44,21 @@ def run_training(
     loss_history_save_path: str = paths.LOSS_HISTORY_FILE_PATH,
     train_predictions_save_path: str = paths.TRAIN_PREDICTIONS_FILE_PATH,
     validation_predictions_save_path: str = paths.VAL_PREDICTIONS_FILE_PATH,
+    training_checkpoint_path: str = paths.TRAINING_CHECKPOINT_FILE_PATH,
+    autotune_report_save_path: str = paths.DATA_LOADER_AUTOTUNE_REPORT_FILE_PATH,
 ) -> None:
     """
     Run the training process and saves model artifacts
 
+    The training state is checkpointed every `training_checkpoint_interval` epochs
+    of the model config (0 disables checkpoints). If a checkpoint of an interrupted
+    run exists, training resumes from it. The checkpoint is removed once the model
+    is saved.
+
+    If `autotune` is enabled in the preprocessing config, the batch size and number
+    of data loader workers are tuned on the training data before training. The
+    tuned values are saved with the data loader and reused for predictions.
+
     Args:
         model_config_file_path (str, optional): The path of the model configuration file.
         train_dir_path (str, optional): The directory path of the train data.
@@ -45,6 +70,8 @@ def run_training(
         loss_history_save_path (str, optional): The file path to where the loss history be save.
         train_predictions_save_path (str, optional): The file path to where the train predictions be save.
         validation_predictions_save_path (str, optional): The file path to where the validation predictions be save.
+        training_checkpoint_path (str, optional): The file path of the training checkpoint.
+        autotune_report_save_path (str, optional): The file path to where the data loader autotuning report be saved.
     Returns:
         None
     """
@@ -70,17 +97,64 @@ def run_training(
                 default_hyperparameters_file_path
             )
 
+            autotune_config = preprocessing_config.pop("autotune", {})
+
             logger.info("Loading input training...")
             data_loader_factory = get_data_loader(model_config["model_name"])(
                 **preprocessing_config
             )
+
+            # Listed once, for autotuning and for the train and validation split
+            train_dataset = data_loader_factory.create_dataset(train_dir_path)
+
+            model = None
+            autotune_report = None
+            if autotune_config.get("enabled", False):
+                logger.info("Tuning batch size and number of data loader workers...")
+                # The tuned model is then trained, so it is only built once
+                model = get_classifier_class(model_config["model_name"])(
+                    model_name=model_config["model_name"],
+                    num_classes=len(train_dataset.classes),
+                    **default_hyperparameters,
+                )
+                autotune_report = autotune_data_loader_factory(
+                    factory=data_loader_factory,
+                    dataset=train_dataset,
+                    model=model,
+                    batch_sizes=autotune_config.get("batch_sizes"),
+                    num_workers=autotune_config.get("num_workers"),
+                    memory_budget_mb=autotune_config.get("memory_budget_mb"),
+                    num_trial_batches=autotune_config.get("trial_batches", 5),
+                )
+                logger.info(
+                    f"Selected batch_size={autotune_report['batch_size']}, "
+                    f"num_workers={autotune_report['num_workers']}"
+                )
+
             train_data_loader, valid_data_loader = (
                 data_loader_factory.create_train_and_valid_data_loaders(
                     train_dir_path=train_dir_path,
                     validation_dir_path=valid_dir_path if VALIDATION_EXISTS else None,
+                    train_dataset=train_dataset,
                 )
             )
 
+            checkpoint_interval = model_config.get("training_checkpoint_interval", 1)
+            if not checkpoint_interval:
+                training_checkpoint_path = None
+            # A checkpoint is only resumed for the same data and training options
+            checkpoint_run_info = {
+                "model_name": model_config["model_name"],
+                "seed_value": model_config["seed_value"],
+                "train_data": get_dataset_fingerprint(train_dir_path, train_dataset),
+                "validation_dir_path": (
+                    os.path.abspath(valid_dir_path) if VALIDATION_EXISTS else None
+                ),
+                "hyperparameters": default_hyperparameters,
+                "preprocessing_config": preprocessing_config,
+                "batch_size": data_loader_factory.batch_size,
+            }
+
             # use default hyperparameters to train model
             logger.info(f"Training model ({model_config['model_name']})...")
             model, history = train_predictor_model(
@@ -89,25 +163,46 @@ def run_training(
                 valid_data=valid_data_loader,
                 num_classes=data_loader_factory.num_classes,
                 hyperparameters=default_hyperparameters,
+                checkpoint_path=training_checkpoint_path,
+                checkpoint_interval=checkpoint_interval,
+                checkpoint_run_info=checkpoint_run_info,
+                model=model,
             )
 
         # save data loader
         logger.info("Saving data loader...")
         data_loader_factory.save(data_loader_save_path)
 
+        if autotune_report is not None:
+            logger.info("Saving data loader autotuning report...")
+            save_json(autotune_report_save_path, autotune_report)
+
         # save predictor model
         logger.info("Saving model...")
-        save_predictor_model(model, predictor_dir_path)
+        save_predictor_model(
+            model,
+            predictor_dir_path,
+            save_inference_graph=model_config.get("save_inference_graph", False),
+        )
+
+        if training_checkpoint_path is not None:
+            remove_training_checkpoint(training_checkpoint_path)
 
         logger.info("Saving loss history...")
         save_dataframe_as_csv(history["loss_history"], loss_history_save_path)
 
+        file_format = model_config.get("predictions_file_format", "csv")
         if history.get("train_predictions", None) is not None:
-            train_predictions = create_predictions_dataframe(
+            logger.info("Saving train predictions...")
+            save_predictions(
                 ids=history["train_ids"],
                 probs=history["train_probabilities"],
                 predictions=history["train_predictions"],
                 class_to_idx=data_loader_factory.class_to_idx,
+                file_path=get_predictions_file_path(
+                    train_predictions_save_path, file_format
+                ),
+                file_format=file_format,
                 truth_labels=list(
                     zip(
                         data_loader_factory.train_image_names,
@@ -115,15 +210,18 @@ def run_training(
                     )
                 ),
             )
-            logger.info("Saving train predictions...")
-            save_dataframe_as_csv(train_predictions, train_predictions_save_path)
 
         if history.get("validation_predictions", None) is not None:
-            validation_predictions = create_predictions_dataframe(
+            logger.info("Saving validation predictions...")
+            save_predictions(
                 ids=history["validation_ids"],
                 probs=history["validation_probabilities"],
                 predictions=history["validation_predictions"],
                 class_to_idx=data_loader_factory.class_to_idx,
+                file_path=get_predictions_file_path(
+                    validation_predictions_save_path, file_format
+                ),
+                file_format=file_format,
                 truth_labels=list(
                     zip(
                         data_loader_factory.val_image_names,
@@ -131,10 +229,6 @@ def run_training(
                     )
                 ),
             )
-            logger.info("Saving validation predictions...")
-            save_dataframe_as_csv(
-                validation_predictions, validation_predictions_save_path
-            )
 
     except Exception as exc:
         err_msg = "Error occurred during training."
@@ -6,6 +6,8 @@ import psutil
 import threading
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import torch
 from typing import Any, Dict, List, Tuple, Union
 
@@ -258,6 +260,224 @@ def create_predictions_dataframe(
     return prediction_df
 
 
+PREDICTIONS_FILE_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+
+
+def get_predictions_file_path(file_path: str, file_format: str) -> str:
+    """
+    Returns the given file path with its extension replaced to match the file format.
+
+    Args:
+    - file_path (str): File path and name of the predictions file.
+    - file_format (str): One of "csv", "parquet" or "arrow".
+
+    Returns:
+    - str: The file path with the extension of the given format.
+    """
+    if file_format not in PREDICTIONS_FILE_EXTENSIONS:
+        raise ValueError(
+            f"Invalid predictions file format: {file_format}. "
+            f"Supported: {list(PREDICTIONS_FILE_EXTENSIONS.keys())}"
+        )
+    return os.path.splitext(file_path)[0] + PREDICTIONS_FILE_EXTENSIONS[file_format]
+
+
+def create_predictions_table(
+    ids: np.ndarray,
+    probs: np.ndarray,
+    predictions: np.ndarray,
+    class_to_idx: dict,
+    truth_labels: List[Tuple[str, Any]] = None,
+) -> pa.Table:
+    """
+    Creates an Arrow table with the same columns as `create_predictions_dataframe`,
+    built directly from the NumPy arrays with float32 probability columns.
+
+    Args:
+    - ids (np.ndarray): An array of identifiers for the samples.
+    - probs (np.ndarray): A 2D array where each row contains the probabilities for each class for a given sample.
+    - predictions (np.ndarray): An array of class indices predicted for each sample.
+    - class_to_idx (dict): A dictionary mapping class names to their respective indices.
+    - truth_labels (List[str], optional): A list of true class labels for each sample. Defaults to None.
+
+    Returns:
+    - pa.Table: A table with an 'id' column, one float32 column per class, a 'prediction'
+        column and, if truth labels are given, a 'label' column.
+    """
+    idx_to_class = {k: v for v, k in class_to_idx.items()}
+    ids = np.asarray(ids, dtype=object)
+    probs = np.asarray(probs, dtype=np.float32)
+    predictions = np.asarray(predictions, dtype=np.int64)
+
+    labels = None
+    if truth_labels is not None:
+        id_to_label = dict(truth_labels)
+        keep = np.array([i in id_to_label for i in ids], dtype=bool)
+        if not keep.all():
+            ids, probs, predictions = ids[keep], probs[keep], predictions[keep]
+        labels = [id_to_label[i] for i in ids]
+
+    class_names = [idx_to_class[i] for i in range(len(class_to_idx))]
+    columns = {"id": pa.array(ids, type=pa.string())}
+    for i, class_name in enumerate(class_names):
+        columns[str(class_name)] = pa.array(np.ascontiguousarray(probs[:, i]))
+    columns["prediction"] = pa.array(
+        np.array(class_names, dtype=object)[predictions], type=pa.string()
+    )
+    if labels is not None:
+        columns["label"] = pa.array(labels, type=pa.string())
+    return pa.table(columns)
+
+
+def save_predictions(
+    ids: np.ndarray,
+    probs: np.ndarray,
+    predictions: np.ndarray,
+    class_to_idx: dict,
+    file_path: str,
+    file_format: str = "csv",
+    truth_labels: List[Tuple[str, Any]] = None,
+) -> None:
+    """
+    Saves predictions and their class probabilities in the given file format.
+
+    CSV files are written through `create_predictions_dataframe` and
+    `save_dataframe_as_csv`. Parquet and Arrow IPC files are written from an Arrow
+    table with float32 probability columns, skipping float formatting.
+
+    Args:
+    - ids (np.ndarray): An array of identifiers for the samples.
+    - probs (np.ndarray): A 2D array of class probabilities for each sample.
+    - predictions (np.ndarray): An array of class indices predicted for each sample.
+    - class_to_idx (dict): A dictionary mapping class names to their respective indices.
+    - file_path (str): File path and name to save the predictions file.
+    - file_format (str): One of "csv", "parquet" or "arrow". Defaults to "csv".
+    - truth_labels (List[str], optional): A list of true class labels for each sample. Defaults to None.
+
+    Raises:
+    - IOError: If an error occurs while saving the file.
+    """
+    if file_format == "csv":
+        predictions_df = create_predictions_dataframe(
+            ids=ids,
+            probs=probs,
+            predictions=predictions,
+            class_to_idx=class_to_idx,
+            truth_labels=truth_labels,
+        )
+        save_dataframe_as_csv(dataframe=predictions_df, file_path=file_path)
+        return
+
+    table = create_predictions_table(
+        ids=ids,
+        probs=probs,
+        predictions=predictions,
+        class_to_idx=class_to_idx,
+        truth_labels=truth_labels,
+    )
+    try:
+        if file_format == "parquet":
+            pq.write_table(table, file_path)
+        elif file_format == "arrow":
+            with pa.OSFile(file_path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        else:
+            raise ValueError(f"Invalid predictions file format: {file_format}")
+    except IOError as exc:
+        raise IOError(f"Error saving {file_format} file: {exc}") from exc
+
+
+class PredictionsWriter:
+    """
+    Context manager that appends batches of predictions to a CSV, Parquet or Arrow
+    IPC file as they are produced, so the full predictions never have to be held
+    in memory. The written file matches the output of `save_predictions` for the
+    same format. The file, with its header or schema, is created on entering the
+    context, so a run without any predictions still writes an empty file.
+    """
+
+    def __init__(self, file_path: str, class_to_idx: dict, file_format: str = "csv"):
+        """
+        Args:
+            file_path (str): File path and name to save the predictions file.
+            class_to_idx (dict): A dictionary mapping class names to their respective indices.
+            file_format (str): One of "csv", "parquet" or "arrow". Defaults to "csv".
+        """
+        if file_format not in PREDICTIONS_FILE_EXTENSIONS:
+            raise ValueError(f"Invalid predictions file format: {file_format}")
+        self.file_path = file_path
+        self.class_to_idx = class_to_idx
+        self.file_format = file_format
+        self.num_rows = 0
+        self.file = None
+        self.writer = None
+
+    def __enter__(self):
+        empty = {
+            "ids": np.empty(0, dtype=object),
+            "probs": np.empty((0, len(self.class_to_idx)), dtype=np.float32),
+            "predictions": np.empty(0, dtype=np.int64),
+            "class_to_idx": self.class_to_idx,
+        }
+        try:
+            if self.file_format == "csv":
+                self.file = open(self.file_path, "w", encoding="utf-8", newline="")
+                create_predictions_dataframe(**empty).to_csv(self.file, index=False)
+                self.file.flush()
+            else:
+                schema = create_predictions_table(**empty).schema
+                if self.file_format == "parquet":
+                    self.writer = pq.ParquetWriter(self.file_path, schema)
+                else:
+                    self.file = pa.OSFile(self.file_path, "wb")
+                    self.writer = pa.ipc.new_file(self.file, schema)
+        except IOError as exc:
+            raise IOError(f"Error opening {self.file_format} file: {exc}") from exc
+        return self
+
+    def write(
+        self, ids: np.ndarray, probs: np.ndarray, predictions: np.ndarray
+    ) -> None:
+        """
+        Append one batch of predictions to the file.
+
+        Args:
+        - ids (np.ndarray): An array of identifiers for the samples in the batch.
+        - probs (np.ndarray): A 2D array of class probabilities for the batch.
+        - predictions (np.ndarray): An array of class indices predicted for the batch.
+        """
+        try:
+            if self.file_format == "csv":
+                batch_df = create_predictions_dataframe(
+                    ids=ids,
+                    probs=probs,
+                    predictions=predictions,
+                    class_to_idx=self.class_to_idx,
+                )
+                batch_df.to_csv(
+                    self.file, index=False, header=False, float_format="%.8f"
+                )
+                self.file.flush()
+            else:
+                table = create_predictions_table(
+                    ids=ids,
+                    probs=probs,
+                    predictions=predictions,
+                    class_to_idx=self.class_to_idx,
+                )
+                self.writer.write_table(table)
+        except IOError as exc:
+            raise IOError(f"Error saving {self.file_format} file: {exc}") from exc
+        self.num_rows += len(predictions)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.writer is not None:
+            self.writer.close()
+        if self.file is not None:
+            self.file.close()
+
+
 def make_serializable(obj: Any) -> Union[int, float, List[Union[int, float]], Any]:
     """
     Converts a given object into a serializable format.